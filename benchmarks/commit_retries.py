@@ -0,0 +1,105 @@
+"""Retry check for CommitManager against a local stub of the graph API, no network.
+
+The stub answers 503 to the first requests of each graph and 200 afterwards. Checks that insert_data
+retries through the 503s with a backoff that stays under its exponential cap, gives up after
+max_retries without waiting once more, and reuses the pooled keep-alive connection.
+
+Run from the repository root:  python -m benchmarks.commit_retries [failures] [retry_delay_ms]
+"""
+import sys
+import time
+import asyncio
+
+from commit_manager import CommitManager
+
+PORT = 8766
+TOKEN = 'stub-token'
+
+
+class StubGraphApi:
+
+    def __init__(self, failures):
+        self.failures = failures
+        # path -> arrival times of its requests
+        self.requests = {}
+        self.connections = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.serve, '127.0.0.1', PORT)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def serve(self, reader, writer):
+        self.connections += 1
+        try:
+            # Keep-alive: one connection carries every request until the client closes it
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b'\r\n', b''):
+                    name, _, value = line.decode().partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                await reader.readexactly(int(headers.get('content-length', 0)))
+
+                path = request_line.split()[1].decode()
+                arrivals = self.requests.setdefault(path, [])
+                arrivals.append(time.perf_counter())
+                if headers.get('x-user-token') != TOKEN:
+                    status = b'403 Forbidden'
+                elif len(arrivals) <= self.failures:
+                    status = b'503 Service Unavailable'
+                else:
+                    status = b'200 OK'
+                writer.write(b'HTTP/1.1 ' + status + b'\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: 2\r\n\r\n{}')
+                await writer.drain()
+        finally:
+            writer.close()
+
+
+async def run(failures, retry_delay):
+    api = StubGraphApi(failures)
+    await api.start()
+    commit_manager = CommitManager(base_url=f"http://127.0.0.1:{PORT}/v1/users", token=TOKEN)
+    failed = False
+    try:
+        # Enough retries to get through the 503s
+        result = await commit_manager.insert_data('Retry Check', 7, max_retries=failures + 1,
+                                                  retry_delay=retry_delay, insert_date='20000103')
+        arrivals = api.requests.get('/v1/users/future-/graphs/retry', [])
+        gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+        # Full jitter waits up to retry_delay * 2 ** retry; the slack covers the request itself
+        capped = all(gap <= retry_delay * 2 ** retry + 0.05 for retry, gap in enumerate(gaps))
+        ok = result == commit_manager.graph_url('Retry Check') and len(arrivals) == failures + 1 and capped
+        failed = failed or not ok
+        print(f"retried through {failures} x 503: {len(arrivals)} requests, "
+              f"waits {', '.join(f'{gap * 1000:.0f}ms' for gap in gaps) or 'none'}, "
+              f"{'returned the graph url' if result else 'returned None'} -> {'ok' if ok else 'FAILED'}")
+
+        # One retry short: the last 503 is final
+        result = await commit_manager.insert_data('Give Up', 7, max_retries=failures,
+                                                  retry_delay=retry_delay, insert_date='20000103')
+        returned = time.perf_counter()
+        arrivals = api.requests.get('/v1/users/future-/graphs/give', [])
+        # No backoff is slept after the last attempt
+        ok = result is None and len(arrivals) == failures and returned - arrivals[-1] < 0.05
+        failed = failed or not ok
+        print(f"max_retries={failures}: {len(arrivals)} requests, returned {result!r} -> {'ok' if ok else 'FAILED'}")
+
+        ok = api.connections == 1
+        failed = failed or not ok
+        print(f"connections opened: {api.connections} -> {'ok' if ok else 'FAILED'}")
+    finally:
+        await commit_manager.close()
+        await api.stop()
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    failures = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    retry_delay = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+    sys.exit(asyncio.run(run(failures, retry_delay)))
@@ -0,0 +1,69 @@
+"""Concurrency check for the per-day upserts: parallel save_mood/save_rating/save_quote calls for the
+same chats and day must leave exactly one document per (chat_id, day) in each collection.
+
+Runs against a scratch database that is dropped afterwards. MONGO_URL defaults to a local server.
+
+Run from the repository root:  python -m benchmarks.day_upserts [chats] [parallel_calls]
+"""
+import os
+import sys
+import random
+import asyncio
+
+from index_manager import IndexManager
+from database_manager import DatabaseManager
+
+DB_NAME = 'journalDB_day_upserts_check'
+DAY = '2000-01-03'
+
+
+async def tap(database_manager, chat_id):
+    # One double-tapped callback of each kind, as fired by an impatient user
+    mood, mood_score = random.choice([("😎", 10), ("😊", 7), ("😐", 5), ("😞", 3)])
+    await asyncio.gather(
+        database_manager.save_mood(chat_id, mood, mood_score, date=DAY),
+        database_manager.save_rating(chat_id, random.randint(1, 10), date=DAY),
+        database_manager.save_quote(chat_id, f"Quote {random.random()}", date=DAY),
+    )
+
+
+async def duplicates(collection):
+    pipeline = [
+        {'$match': {'day': DAY}},
+        {'$group': {'_id': '$chat_id', 'documents': {'$sum': 1}}},
+        {'$match': {'documents': {'$ne': 1}}},
+    ]
+    return await collection.aggregate(pipeline).to_list(None)
+
+
+async def run(chats, parallel_calls):
+    database_manager = DatabaseManager(os.getenv("MONGO_URL", "mongodb://localhost:27017"), db_name=DB_NAME)
+    await database_manager.client.drop_database(DB_NAME)
+    try:
+        # The unique (chat_id, day) indexes are what keeps racing upserts to one document
+        await IndexManager(database_manager).ensure_indexes()
+
+        await asyncio.gather(*(
+            tap(database_manager, chat_id)
+            for chat_id in range(chats)
+            for _ in range(parallel_calls)
+        ))
+
+        failed = False
+        for collection in (database_manager.moods_collection, database_manager.ratings_collection,
+                           database_manager.quotes_collection, database_manager.counter_collection):
+            found = await duplicates(collection)
+            stored = await collection.count_documents({'day': DAY})
+            ok = not found and stored == chats
+            failed = failed or not ok
+            print(f"{collection.name}: {stored} documents for {chats} chats, "
+                  f"{'one per (chat_id, day)' if ok else f'NOT one per (chat_id, day): {found[:5]}'}")
+        return 1 if failed else 0
+    finally:
+        await database_manager.client.drop_database(DB_NAME)
+
+
+if __name__ == '__main__':
+    chats = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    parallel_calls = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    sys.exit(asyncio.run(run(chats, parallel_calls)))
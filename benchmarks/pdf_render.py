@@ -0,0 +1,80 @@
+"""Per-journal render time and allocations, re-parsing the template every time vs the cached page.
+
+Run from the repository root:  python -m benchmarks.pdf_render [iterations]
+"""
+import io
+import sys
+import time
+import tracemalloc
+from PyPDF2 import PdfWriter, PdfReader
+
+import pdf_manager
+from pdf_manager import JournalRenderer
+
+
+def fill_sample_day(manager):
+    manager.write_down(54, 621, [f"●  Sample task number {i} ✔  (10:{i:02d})" for i in range(8)])
+    manager.write_down(54, 165, [f"●  Sample habit number {i}" for i in range(5)])
+    manager.write_down(336, 621, [f"●  A longer sample note that has to be wrapped over lines {i}    (12:00)"
+                                  for i in range(4)])
+    manager.insert_quote(336, 165, "The secret of getting ahead is getting started.")
+    manager.insert_emoji(374, 758, "😊")
+    manager.insert_score(515, 758, 8)
+    manager.insert_state(115, 28, "Berlin, Learning IT")
+
+
+def legacy_merge_template(manager):
+    # The merge path before the template cache: open and parse day.pdf on every journal
+    manager.can.setFont("DejaVuSans", 14)
+    manager.can.drawString(373, 707, "01 / Jan / 2000   (Sat)")
+    manager.can.save()
+    manager.packet.seek(0)
+
+    existing_pdf = PdfReader(open(pdf_manager.template_path, "rb"))
+    new_pdf = PdfWriter()
+    page = existing_pdf.pages[0]
+    page.merge_page(PdfReader(manager.packet).pages[0])
+    new_pdf.add_page(page)
+
+    pdf_data_buffer = io.BytesIO()
+    new_pdf.write(pdf_data_buffer)
+    return pdf_data_buffer.getvalue()
+
+
+def cached_merge_template(manager):
+    return manager.merge_template("01 / Jan / 2000   (Sat)")
+
+
+def measure(name, merge, iterations):
+    # Warm-up render, also loads the cached template so it is not counted per journal
+    manager = JournalRenderer()
+    fill_sample_day(manager)
+    merge(manager)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        manager = JournalRenderer()
+        fill_sample_day(manager)
+        merge(manager)
+    per_journal_ms = (time.perf_counter() - started) / iterations * 1000
+
+    tracemalloc.start()
+    manager = JournalRenderer()
+    fill_sample_day(manager)
+    merge(manager)
+    allocated, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:>8}: {per_journal_ms:8.2f} ms/journal, "
+          f"{allocated / 1024:8.1f} KiB retained, {peak / 1024:8.1f} KiB peak")
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    print(f"Rendering {iterations} journals on {pdf_manager.template_path}")
+    measure('before', legacy_merge_template, iterations)
+    measure('after', cached_merge_template, iterations)
+
+
+if __name__ == '__main__':
+    main()
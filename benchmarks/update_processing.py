@@ -0,0 +1,86 @@
+"""Update throughput of ChatUpdateProcessor against sequential processing, with simulated handler I/O.
+
+Every update is handled by a coroutine that sleeps like a handler waiting on Mongo or the Bot API.
+Also checks that the updates of each chat were handled in the order they arrived, and how long the
+other chats wait while a single chat floods the bot.
+
+Run from the repository root:  python -m benchmarks.update_processing [updates] [chats] [handler_ms]
+"""
+import sys
+import time
+import asyncio
+from types import SimpleNamespace
+
+from update_manager import ChatUpdateProcessor
+
+
+async def handle(update, handler_seconds, handled):
+    await asyncio.sleep(handler_seconds)
+    handled.append((update.effective_chat.id, update.update_id))
+
+
+async def run(max_concurrent_updates, updates, chats, handler_seconds):
+    processor = ChatUpdateProcessor(max_concurrent_updates)
+    handled = []
+    incoming = [
+        SimpleNamespace(update_id=update_id, effective_chat=SimpleNamespace(id=update_id % chats),
+                        effective_user=None)
+        for update_id in range(updates)
+    ]
+
+    # The Application starts one task per update, in the order the updates arrive
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        asyncio.create_task(processor.process_update(update, handle(update, handler_seconds, handled)))
+        for update in incoming
+    ))
+    elapsed = time.perf_counter() - started
+
+    in_order = all(
+        [update_id for chat_id, update_id in handled if chat_id == chat] ==
+        [update.update_id for update in incoming if update.effective_chat.id == chat]
+        for chat in range(chats)
+    )
+    print(f"max_concurrent_updates={max_concurrent_updates:>4}: {updates / elapsed:8.1f} updates/s "
+          f"({elapsed:.2f}s), per-chat order kept: {in_order}, locks left: {len(processor.chat_locks)}")
+
+
+async def flood(max_concurrent_updates, flood_updates, chats, handler_seconds):
+    processor = ChatUpdateProcessor(max_concurrent_updates)
+    handled = []
+    # Chat 0 sends flood_updates updates before each other chat sends one
+    incoming = [SimpleNamespace(update_id=update_id, effective_chat=SimpleNamespace(id=0), effective_user=None)
+                for update_id in range(flood_updates)]
+    incoming += [SimpleNamespace(update_id=flood_updates + chat, effective_chat=SimpleNamespace(id=chat),
+                                 effective_user=None)
+                 for chat in range(1, chats)]
+
+    started = time.perf_counter()
+    coroutines = [handle(update, handler_seconds, handled) for update in incoming]
+    tasks = [asyncio.create_task(processor.process_update(update, coroutine))
+             for update, coroutine in zip(incoming, coroutines)]
+    await asyncio.gather(*tasks[flood_updates:])
+    elapsed = time.perf_counter() - started
+
+    # The rest of the flood is not waited for
+    for task in tasks[:flood_updates]:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for coroutine in coroutines:
+        coroutine.close()
+    print(f"max_concurrent_updates={max_concurrent_updates:>4}: the other {chats - 1} chats were handled "
+          f"{elapsed:.2f}s after chat 0 sent {flood_updates} updates")
+
+
+if __name__ == '__main__':
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    chats = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    handler_seconds = (int(sys.argv[3]) if len(sys.argv) > 3 else 20) / 1000
+
+    print(f"{updates} updates from {chats} chats, {handler_seconds * 1000:.0f} ms per handler")
+    for max_concurrent_updates in (1, 16, 64, 256):
+        asyncio.run(run(max_concurrent_updates, updates, chats, handler_seconds))
+
+    print(f"One chat flooding {updates} updates")
+    for max_concurrent_updates in (16, 256):
+        asyncio.run(flood(max_concurrent_updates, updates, chats, handler_seconds))
@@ -0,0 +1,81 @@
+"""Webhook intake throughput: synthetic Telegram updates posted to a local WebhookServer, no network.
+
+Run from the repository root:  python -m benchmarks.webhook_load [updates] [concurrency]
+"""
+import sys
+import time
+import asyncio
+import httpx
+from telegram import Bot
+
+from webhook_manager import WebhookServer
+
+PORT = 8765
+SECRET = 'benchmark-secret'
+
+
+def synthetic_update(update_id):
+    chat = {'id': 1000 + update_id % 50, 'type': 'private', 'first_name': 'Bench'}
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': chat,
+            'from': {'id': chat['id'], 'is_bot': False, 'first_name': 'Bench'},
+            'text': f"Sample task number {update_id}",
+        },
+    }
+
+
+async def consume(update_queue, handled):
+    # Stands in for the Application's update fetcher
+    while True:
+        await update_queue.get()
+        handled.append(time.perf_counter())
+        update_queue.task_done()
+
+
+async def run(updates, concurrency):
+    update_queue = asyncio.Queue()
+    server = WebhookServer(update_queue, Bot('123456:benchmark'), listen='127.0.0.1', port=PORT,
+                           secret_token=SECRET)
+    server.start()
+    handled = []
+    consumer = asyncio.create_task(consume(update_queue, handled))
+
+    url = f"http://127.0.0.1:{PORT}/{server.path}"
+    headers = {'X-Telegram-Bot-Api-Secret-Token': SECRET}
+    pending = iter(range(updates))
+    latencies = []
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrency)) as client:
+        async def sender():
+            for update_id in pending:
+                started = time.perf_counter()
+                response = await client.post(url, json=synthetic_update(update_id), headers=headers)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(sender() for _ in range(concurrency)))
+        await update_queue.join()
+        elapsed = time.perf_counter() - started
+
+        health = (await client.get(f"http://127.0.0.1:{PORT}/health")).json()
+
+    consumer.cancel()
+    await server.stop()
+
+    latencies.sort()
+    print(f"{updates} updates, {concurrency} concurrent senders")
+    print(f"throughput: {updates / elapsed:.0f} updates/s ({elapsed:.2f}s)")
+    print(f"latency p50: {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99: {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    print(f"handled: {len(handled)}, health: {health}")
+
+
+if __name__ == '__main__':
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(run(updates, concurrency))
@@ -0,0 +1,86 @@
+import os
+import asyncio
+import hashlib
+import tempfile
+from pymongo.errors import DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+
+def content_key(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class GridFSBlobStore:
+    name = 'gridfs'
+
+    def __init__(self, db, bucket_name='journal_pdfs'):
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+        self.files_collection = db[f'{bucket_name}.files']
+
+    async def exists(self, key):
+        return await self.files_collection.find_one({'_id': key}, {'_id': 1}) is not None
+
+    async def put(self, data):
+        key = content_key(data)
+        if not await self.exists(key):
+            try:
+                await self.bucket.upload_from_stream_with_id(key, key, data)
+            except DuplicateKeyError:
+                # The same content was stored concurrently
+                pass
+        return key
+
+    async def get(self, key):
+        stream = await self.bucket.open_download_stream(key)
+        return await stream.read()
+
+
+class FileBlobStore:
+    name = 'file'
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    async def exists(self, key):
+        return await asyncio.to_thread(os.path.exists, self._path(key))
+
+    async def put(self, data):
+        key = content_key(data)
+        await asyncio.to_thread(self._write, self._path(key), data)
+        return key
+
+    async def get(self, key):
+        return await asyncio.to_thread(self._read, self._path(key))
+
+    @staticmethod
+    def _write(path, data):
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write aside and rename so readers never see a partial blob; each write gets its own temp file,
+        # as two threads may store the same content at once
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as blob_file:
+                blob_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as blob_file:
+            return blob_file.read()
+
+
+def blob_store_from_env(db):
+    # BLOB_STORE=gridfs (default) keeps blobs in the same database,
+    # BLOB_STORE=file writes them under BLOB_DIR on the local disk.
+    if os.getenv("BLOB_STORE", "gridfs") == "file":
+        script_directory = os.path.dirname(os.path.realpath(__file__))
+        return FileBlobStore(os.getenv("BLOB_DIR", os.path.join(script_directory, 'OutputPDFs')))
+    return GridFSBlobStore(db)
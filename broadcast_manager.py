@@ -0,0 +1,98 @@
+import time
+import asyncio
+import telegram
+from datetime import timedelta
+
+
+class TokenBucket:
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        # Flood control applies to the whole bot, so every sender waits it out
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class BroadcastManager:
+    """Delivers one job to many chats concurrently while staying under Telegram's global rate limit."""
+
+    def __init__(self, rate_limit=30, max_concurrency=20, max_retries=3, progress_every=500):
+        self.bucket = TokenBucket(rate_limit)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.progress_every = progress_every
+
+    async def send(self, request):
+        # request is a zero-argument callable returning a fresh Bot API coroutine on every attempt
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                return await request()
+            except telegram.error.RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                retry_after = e.retry_after
+                if isinstance(retry_after, timedelta):
+                    retry_after = retry_after.total_seconds()
+                print(f"Flood control exceeded. Retrying in {retry_after} seconds...")
+                self.bucket.pause(retry_after)
+
+    async def send_message(self, bot, chat_id, text, **kwargs):
+        return await self.send(lambda: bot.send_message(chat_id=chat_id, text=text, **kwargs))
+
+    async def broadcast(self, name, users, deliver):
+        """Await deliver(user) for every user with bounded concurrency and return the delivery stats."""
+        total = len(users)
+        pending = iter(users)
+        stats = {'done': 0, 'sent': 0, 'forbidden': 0, 'failed': 0}
+        started = time.monotonic()
+
+        async def worker():
+            # Workers share one iterator, so each user is taken exactly once
+            for user in pending:
+                try:
+                    await deliver(user)
+                    stats['sent'] += 1
+                except telegram.error.Forbidden as e:
+                    stats['forbidden'] += 1
+                    print(f"Could not send {name} to chat_id {user['chat_id']}. Forbidden: {e}")
+                except Exception as e:
+                    stats['failed'] += 1
+                    print(f"An error occurred while sending {name} to {user['chat_id']}: {e}")
+
+                stats['done'] += 1
+                if stats['done'] % self.progress_every == 0:
+                    self._print_progress(name, total, stats, started)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.max_concurrency, total))))
+        self._print_progress(name, total, stats, started)
+        return stats
+
+    @staticmethod
+    def _print_progress(name, total, stats, started):
+        elapsed = time.monotonic() - started
+        rate = stats['done'] / elapsed if elapsed else 0
+        print(f"{name}: {stats['done']}/{total} done, {stats['sent']} sent, "
+              f"{stats['forbidden']} forbidden, {stats['failed']} failed ({rate:.1f} chats/s)")
@@ -0,0 +1,105 @@
+import time
+from collections import OrderedDict
+
+
+class ProfileCache:
+    """Bounded LRU cache of user documents whose entries also expire after ttl seconds."""
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (found, value); a cached None means the document is known not to exist."""
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.entries.pop(key, None)
+            self.misses += 1
+            return False, None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0,
+        }
+
+
+class DayCache:
+    """Per-chat lists of today's tasks, notes and habits, kept current by the DatabaseManager writers.
+
+    Entries belong to one day and are dropped once the day rolls over. They stay correct as
+    long as all of a chat's writes go through this process; DAY_CACHE_SIZE=0 turns it off, and
+    BOT_WORKERS above 1 (several processes sharing the chats) does too.
+    """
+
+    def __init__(self, maxsize=5000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.day = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chat_id, kind, day):
+        entry = self.entries.get((chat_id, kind))
+        if entry is None or entry[0] != day:
+            self.misses += 1
+            return None
+        self.entries.move_to_end((chat_id, kind))
+        self.hits += 1
+        return entry[1]
+
+    def put(self, chat_id, kind, day, docs):
+        if self.maxsize <= 0:
+            return
+        if day != self.day:
+            self.evict_stale(day)
+        self.entries[(chat_id, kind)] = (day, list(docs))
+        self.entries.move_to_end((chat_id, kind))
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def update(self, chat_id, kind, day, mutate):
+        # Applies a write to the cached list, if that chat's list for that day is cached
+        entry = self.entries.get((chat_id, kind))
+        if entry is not None and entry[0] == day:
+            mutate(entry[1])
+
+    def invalidate(self, chat_id, kind):
+        self.entries.pop((chat_id, kind), None)
+
+    def evict_stale(self, day):
+        self.day = day
+        for key in [key for key, entry in self.entries.items() if entry[0] != day]:
+            del self.entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0,
+        }
@@ -1,6 +1,7 @@
 import os
-import time
-import requests
+import random
+import asyncio
+import httpx
 import datetime as dt
 from dotenv import load_dotenv
 from unidecode import unidecode
@@ -8,13 +9,27 @@ from unidecode import unidecode
 
 class CommitManager:
 
-    def __init__(self):
+    def __init__(self, base_url=None, token=None, timeout=10, max_connections=10):
         load_dotenv()
-        self.BASE_URL = os.getenv("BASE_URL")
-        self.TOKEN = os.getenv("USER_TOKEN")
+        self.BASE_URL = base_url or os.getenv("BASE_URL")
+        self.TOKEN = token or os.getenv("USER_TOKEN")
         self.headers = {
             "X-USER-TOKEN": self.TOKEN}
         self.BASE_GRAPH_URL = f"{self.BASE_URL}/future-/graphs"
+        self.timeout = httpx.Timeout(timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.client = None
+
+    def _get_client(self):
+        # One pooled keep-alive client, created inside the running event loop on first use
+        if self.client is None:
+            self.client = httpx.AsyncClient(headers=self.headers, timeout=self.timeout, limits=self.limits)
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
 
     @staticmethod
     def convert_name(user_name):
@@ -24,17 +39,21 @@ class CommitManager:
             converted_name = parts[0]
         return converted_name
 
-    def create_user(self, user_name):
+    async def create_user(self, user_name):
         post_params = {
             "token": self.TOKEN,
             "username": user_name,
             "agreeTermsOfService": "yes",
             "notMinor": "yes"
         }
-        response = requests.post(url=self.BASE_URL, json=post_params)
-        print(response.raise_for_status())
+        return await self._make_request(
+            method="POST",
+            url=self.BASE_URL,
+            json=post_params,
+            message=f"User {user_name} was created"
+        )
 
-    def create_graph(self, user_name):
+    async def create_graph(self, user_name):
         converted_name = self.convert_name(user_name)
 
         graph_params = {
@@ -45,25 +64,28 @@ class CommitManager:
             "color": "sora"
         }
 
-        return self._make_request(
-            method=requests.post,
+        return await self._make_request(
+            method="POST",
             url=f"{self.BASE_GRAPH_URL}",
             json=graph_params,
             graph_id=converted_name
         )
 
-    def insert_data(self, user_name, user_quantity, max_retries=10, retry_delay=2):
+    def graph_url(self, user_name):
+        return f"{self.BASE_GRAPH_URL}/{self.convert_name(user_name)}.html"
+
+    async def insert_data(self, user_name, user_quantity, max_retries=10, retry_delay=2, insert_date=None):
         converted_name = self.convert_name(user_name)
-        today = dt.datetime.now()
-        insert_date = today.strftime("%Y%m%d")
+        if insert_date is None:
+            insert_date = dt.datetime.now().strftime("%Y%m%d")
         graph_params = {
             "date": str(insert_date),
             "quantity": str(user_quantity)
         }
         url = f"{self.BASE_GRAPH_URL}/{converted_name}"
 
-        return self._make_request(
-            method=requests.post,
+        return await self._make_request(
+            method="POST",
             url=url,
             json=graph_params,
             max_retries=max_retries,
@@ -71,62 +93,64 @@ class CommitManager:
             graph_id=converted_name
         )
 
-    def update_data(self, user_name, new_quantity, update_date):
+    async def update_data(self, user_name, new_quantity, update_date):
         converted_name = self.convert_name(user_name)
         graph_params = {
             "date": str(update_date),
             "quantity": str(new_quantity)
         }
         url = f"{self.BASE_GRAPH_URL}/{converted_name}/{update_date}"
-        return self._make_request(
-            method=requests.put,
+        return await self._make_request(
+            method="PUT",
             url=url,
             json=graph_params,
             graph_id=converted_name
         )
 
-    def delete_data(self, user_name, delete_date):
+    async def delete_data(self, user_name, delete_date):
         converted_name = self.convert_name(user_name)
         url = f"{self.BASE_GRAPH_URL}/{converted_name}/{delete_date}"
-        return self._make_request(
-            method=requests.delete,
+        return await self._make_request(
+            method="DELETE",
             url=url,
             graph_id=converted_name
         )
 
-    def delete_graph(self, user_name):
+    async def delete_graph(self, user_name):
         converted_name = self.convert_name(user_name)
         url = f"{self.BASE_GRAPH_URL}/{converted_name}"
-        return self._make_request(
-            method=requests.delete,
+        return await self._make_request(
+            method="DELETE",
             url=url,
             message="You successfully Deleted graph"
         )
 
-    def _make_request(self, method, url, json=None, max_retries=10, retry_delay=3, graph_id=None, message=None):
+    async def _make_request(self, method, url, json=None, max_retries=10, retry_delay=3, max_delay=30,
+                            graph_id=None, message=None):
         retries = 0
-        response = None
         graph_url = f"{self.BASE_GRAPH_URL}/{graph_id}.html"
         while retries < max_retries:
             try:
-                response = method(url=url, json=json, headers=self.headers)
+                response = await self._get_client().request(method, url, json=json)
                 response.raise_for_status()
                 return graph_url if graph_id else message
-            except requests.exceptions.HTTPError as errh:
-                if response is not None and response.status_code == 503:
-                    print(f"HTTP Error: {errh}. Retrying...")
+            except httpx.HTTPStatusError as errh:
+                if errh.response.status_code == 503 and retries + 1 < max_retries:
+                    # Exponential backoff with full jitter, without blocking the event loop
+                    delay = random.uniform(0, min(max_delay, retry_delay * 2 ** retries))
+                    print(f"HTTP Error: {errh}. Retrying in {delay:.1f}s...")
                     retries += 1
-                    time.sleep(retry_delay)
+                    await asyncio.sleep(delay)
                 else:
                     print(f"HTTP Error: {errh}")
                     return
-            except requests.exceptions.ConnectionError as errc:
+            except httpx.ConnectError as errc:
                 print(f"Error Connecting: {errc}")
                 return
-            except requests.exceptions.Timeout as errt:
+            except httpx.TimeoutException as errt:
                 print(f"Timeout Error: {errt}")
                 return
-            except requests.exceptions.RequestException as err:
+            except httpx.HTTPError as err:
                 print(f"An unexpected error occurred: {err}")
                 return
 
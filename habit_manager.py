@@ -1,8 +1,14 @@
-from telegram import Update
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import CallbackContext
 
 
 class HabitManager:
+    CHECKED = "✅"
+    UNCHECKED = "⬜"
+    TOGGLE = "habit_toggle:"
+    CONFIRM = "habit_confirm"
+    # user_data key of the open check-in: its message_id, [[habit id, description], ...] and the checked ids
+    CHECKIN = "habit_checkin"
 
     def __init__(self, db):
         self.db = db
@@ -16,7 +22,7 @@ class HabitManager:
         chat_id = update.message.chat_id
         habit_description = update.message.text.strip()
 
-        habit_id = self.db.save_habit(chat_id, habit_description)
+        habit_id = await self.db.save_habit(chat_id, habit_description)
 
         if habit_id:
             context.user_data[chat_id]['state'] = ''
@@ -25,9 +31,10 @@ class HabitManager:
     async def show_habits(self, update: Update, context: CallbackContext):
         chat_id = update.message.chat_id
 
-        habits = self.db.get_habits(chat_id)
+        habits = await self.db.get_habits(chat_id)
 
         if habits:
+            streaks = await self.db.get_habit_streaks(chat_id)
 
             action_habits = [habit for habit in habits if not habit.get('completed', False)]
             completed_habits = [habit for habit in habits if habit.get('completed', True)]
@@ -37,7 +44,8 @@ class HabitManager:
                 action_habits_message = "Action Habits🔥:\n__________________________\n" + action_habits_text
                 await update.message.reply_text(action_habits_message)
             if completed_habits:
-                completed_habits_text = "\n".join([f"● {habit['description']}" for habit in completed_habits])
+                completed_habits_text = "\n".join([f"● {habit['description']} 🔥{streaks.get(habit['id'], 1)}"
+                                                   for habit in completed_habits])
                 completed_habits_message = "Completed Habits✅:\n__________________________\n" + completed_habits_text
                 await update.message.reply_text(completed_habits_message)
         else:
@@ -46,7 +54,7 @@ class HabitManager:
     async def complete_habit(self, update: Update, context: CallbackContext):
         chat_id = update.message.chat_id
 
-        habits = self.db.get_habits(chat_id)
+        habits = await self.db.get_habits(chat_id)
 
         action_habits = [habit for habit in habits if 'completed' not in habit or habit['completed'] is False]
 
@@ -65,11 +73,14 @@ class HabitManager:
         try:
             habit_id = int(user_input)
 
-            if self.db.habit_exists(chat_id, habit_id):
-                completed = self.db.complete_habit(chat_id, habit_id)
-                if completed:
-                    context.user_data[chat_id]['state'] = ''
-                    await update.message.reply_text(f"The habit No.{habit_id} has been marked as completed✅")
+            result = await self.db.complete_habit(chat_id, habit_id)
+
+            if result.modified:
+                context.user_data[chat_id]['state'] = ''
+                await update.message.reply_text(f"The habit No.{habit_id} has been marked as completed✅")
+            elif result.matched:
+                context.user_data[chat_id]['state'] = ''
+                await update.message.reply_text(f"The habit No.{habit_id} is already completed✅")
             else:
                 context.user_data[chat_id] = {'state': 'complete_habit'}
                 await update.message.reply_text("Invalid habit ID. Please choose a valid ID from the list👆🏿")
@@ -77,9 +88,57 @@ class HabitManager:
             context.user_data[chat_id] = {'state': 'complete_habit'}
             await update.message.reply_text("Invalid input. Please enter a valid habit ID numer.")
 
+    def checkin_markup(self, habits, checked=()):
+        keyboard = [
+            [InlineKeyboardButton(f"{self.CHECKED if habit_id in checked else self.UNCHECKED} {description}",
+                                  callback_data=f"{self.TOGGLE}{habit_id}")]
+            for habit_id, description in habits
+        ]
+        keyboard.append([InlineKeyboardButton("Done", callback_data=self.CONFIRM)])
+        return InlineKeyboardMarkup(keyboard)
+
+    async def send_checkin(self, update: Update, context: CallbackContext, habits):
+        habits = [[habit['id'], habit['description']] for habit in habits]
+        message = await update.message.reply_text('Which habits have you attended or done today?',
+                                                  reply_markup=self.checkin_markup(habits))
+        # The selection lives here rather than in the keyboard: a callback carries the message as it was
+        # when tapped, so a quick second tap would not see the first one yet
+        context.user_data[self.CHECKIN] = {'message_id': message.message_id, 'habits': habits, 'checked': []}
+
+    async def handle_checkin(self, update: Update, context: CallbackContext):
+        query = update.callback_query
+        chat_id = query.message.chat_id
+        checkin = context.user_data.get(self.CHECKIN)
+        if checkin is None or checkin['message_id'] != query.message.message_id:
+            # A tap that arrived after Done, or on the keyboard of an earlier check-in
+            await query.answer()
+            return
+
+        if query.data.startswith(self.TOGGLE):
+            habit_id = int(query.data[len(self.TOGGLE):])
+            if habit_id in checkin['checked']:
+                checkin['checked'].remove(habit_id)
+            else:
+                checkin['checked'].append(habit_id)
+            await query.edit_message_reply_markup(self.checkin_markup(checkin['habits'], checkin['checked']))
+            await query.answer()
+            return
+
+        del context.user_data[self.CHECKIN]
+        checked = [[habit_id, description] for habit_id, description in checkin['habits']
+                   if habit_id in checkin['checked']]
+        await self.db.complete_habits(chat_id, [habit_id for habit_id, _ in checked])
+
+        if checked:
+            habits_text = "\n".join([f"● {description}" for _, description in checked])
+            await query.edit_message_text(f"Habits done today✅:\n{habits_text}")
+        else:
+            await query.edit_message_text("No worries, tomorrow is a new opportunity. You got this💪🏿")
+        await query.answer()
+
     async def delete_habit(self, update: Update, context: CallbackContext):
         chat_id = update.message.chat_id
-        habits = self.db.get_habits(chat_id)
+        habits = await self.db.get_habits(chat_id)
         if habits:
             context.user_data[chat_id] = {'state': 'delete_habit'}
             habit_text = "\n".join([f"{habit['id']}. {habit['description']}" for habit in habits])
@@ -95,9 +154,9 @@ class HabitManager:
         try:
             habit_id = int(user_input)
 
-            if self.db.habit_exists(chat_id, habit_id):
+            result = await self.db.delete_habit(chat_id, habit_id)
 
-                self.db.delete_habit(chat_id, habit_id)
+            if result.matched:
                 context.user_data[chat_id]['state'] = ''
                 await update.message.reply_text(f"The task No.{habit_id} has been removed!")
             else:
@@ -0,0 +1,48 @@
+import asyncio
+from collections import OrderedDict
+from pymongo import ReturnDocument
+
+
+class IdAllocator:
+    """Hands out sequential ids from blocks reserved on a counter document with one atomic $inc.
+
+    Blocks reserved by different bot processes never overlap, so ids stay unique; ids still
+    unused in a block when the process stops (or the block is evicted) are skipped.
+    """
+
+    def __init__(self, counter_collection, block_size=10, max_blocks=10000):
+        self.counter_collection = counter_collection
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        # (counter filter, field) -> {'lock', 'next', 'last'}, least recently used first
+        self.blocks = OrderedDict()
+
+    async def allocate(self, counter_filter, field):
+        """Return the next id for the counter document matching counter_filter."""
+        key = (tuple(sorted(counter_filter.items())), field)
+        block = self.blocks.get(key)
+        if block is None:
+            block = self.blocks[key] = {'lock': asyncio.Lock(), 'next': 1, 'last': 0}
+            self._evict()
+        self.blocks.move_to_end(key)
+
+        async with block['lock']:
+            if block['next'] > block['last']:
+                counter_doc = await self.counter_collection.find_one_and_update(
+                    counter_filter,
+                    {"$inc": {field: self.block_size}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+                block['next'] = counter_doc[field] - self.block_size + 1
+                block['last'] = counter_doc[field]
+
+            block['next'] += 1
+            return block['next'] - 1
+
+    def _evict(self):
+        while len(self.blocks) > self.max_blocks:
+            key, block = next(iter(self.blocks.items()))
+            if block['lock'].locked():
+                break
+            del self.blocks[key]
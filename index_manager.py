@@ -0,0 +1,176 @@
+import sys
+import asyncio
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+
+class IndexManager:
+    # Seconds after their last change that abandoned conversation states are removed
+    STATE_TTL = 86400
+
+    # Indexes for every collection, keyed by the DatabaseManager attribute holding it.
+    # Each one is the leftmost prefix for the query shapes listed in QUERY_SHAPES.
+    INDEXES = {
+        'users_collection': [
+            IndexModel([('chat_id', ASCENDING)], name='chat_id_unique', unique=True),
+            IndexModel([('updated_at', ASCENDING)], name='updated_at'),
+        ],
+        'tasks_collection': [
+            IndexModel([('chat_id', ASCENDING), ('day', ASCENDING), ('id', ASCENDING)],
+                       name='chat_day_id_unique', unique=True),
+        ],
+        'notes_collection': [
+            IndexModel([('chat_id', ASCENDING), ('day', ASCENDING), ('id', ASCENDING)],
+                       name='chat_day_id_unique', unique=True),
+        ],
+        'habits_collection': [
+            IndexModel([('chat_id', ASCENDING), ('id', ASCENDING)], name='chat_id_unique', unique=True),
+        ],
+        'quotes_collection': [
+            IndexModel([('chat_id', ASCENDING), ('day', ASCENDING)], name='chat_day_unique', unique=True),
+        ],
+        'moods_collection': [
+            IndexModel([('chat_id', ASCENDING), ('day', ASCENDING)], name='chat_day_unique', unique=True),
+        ],
+        'ratings_collection': [
+            IndexModel([('chat_id', ASCENDING), ('day', ASCENDING)], name='chat_day_unique', unique=True),
+        ],
+        'counter_collection': [
+            IndexModel([('chat_id', ASCENDING), ('day', ASCENDING)], name='chat_day_unique', unique=True),
+        ],
+        'graphs_collection': [
+            IndexModel([('chat_id', ASCENDING)], name='chat_id'),
+        ],
+        'journal_collection': [
+            IndexModel([('chat_id', ASCENDING), ('day', ASCENDING), ('user_name', ASCENDING)],
+                       name='chat_day_user_unique', unique=True),
+        ],
+        'outbox_collection': [
+            IndexModel([('key', ASCENDING)], name='key_unique', unique=True),
+            IndexModel([('next_attempt_at', ASCENDING)], name='next_attempt_at'),
+        ],
+        'habit_completions_collection': [
+            IndexModel([('chat_id', ASCENDING), ('habit_id', ASCENDING), ('day', ASCENDING)],
+                       name='chat_habit_day_unique', unique=True),
+            IndexModel([('chat_id', ASCENDING), ('day', ASCENDING)], name='chat_day'),
+        ],
+        'media_collection': [
+            IndexModel([('name', ASCENDING)], name='name_unique', unique=True),
+        ],
+        'states_collection': [
+            IndexModel([('key', ASCENDING)], name='key_unique', unique=True),
+            IndexModel([('updated_at', ASCENDING)], name='updated_at_ttl', expireAfterSeconds=STATE_TTL),
+        ],
+        'rollups_collection': [
+            IndexModel([('chat_id', ASCENDING), ('week', ASCENDING)], name='chat_week_unique', unique=True),
+            IndexModel([('week', ASCENDING)], name='week'),
+        ],
+    }
+
+    # Indexes on the legacy '%d-%m-%Y' date field, superseded by the 'day' ones above, and the
+    # 'day' indexes of the all-users weekly aggregation that weekly_rollups replaced
+    OBSOLETE_INDEXES = {
+        'tasks_collection': ['chat_date_id_unique', 'day'],
+        'notes_collection': ['chat_date_id_unique'],
+        'quotes_collection': ['chat_date_unique'],
+        'moods_collection': ['chat_date_unique'],
+        'ratings_collection': ['chat_date_unique', 'day'],
+        'counter_collection': ['chat_date_unique', 'day'],
+        'journal_collection': ['chat_date_user_unique'],
+    }
+
+    # One sample filter per query shape used by database_manager.py and outbox_manager.py
+    QUERY_SHAPES = [
+        ('users_collection', {'chat_id': 0}),
+        ('users_collection', {'updated_at': {'$gte': 0}}),
+        ('tasks_collection', {'chat_id': 0, 'day': '2000-01-01'}),
+        ('tasks_collection', {'chat_id': 0, 'id': 1, 'day': '2000-01-01'}),
+        ('notes_collection', {'chat_id': 0, 'day': '2000-01-01'}),
+        ('notes_collection', {'chat_id': 0, 'id': 1, 'day': '2000-01-01'}),
+        ('habits_collection', {'chat_id': 0}),
+        ('habits_collection', {'chat_id': 0, 'id': 1}),
+        ('habits_collection', {'chat_id': 0, 'deleted_day': {'$exists': False}}),
+        ('habits_collection', {'chat_id': 0, 'id': 1, 'deleted_day': {'$exists': False}}),
+        ('quotes_collection', {'chat_id': 0, 'day': '2000-01-01'}),
+        ('moods_collection', {'chat_id': 0, 'day': '2000-01-01'}),
+        ('ratings_collection', {'chat_id': 0, 'day': '2000-01-01'}),
+        ('counter_collection', {'chat_id': 0, 'day': '2000-01-01'}),
+        ('counter_collection', {'chat_id': 'User 0'}),
+        ('graphs_collection', {'chat_id': 0}),
+        ('journal_collection', {'chat_id': 0, 'user_name': '', 'day': '2000-01-01'}),
+        ('outbox_collection', {'key': '0:2000-01-01'}),
+        ('outbox_collection', {'next_attempt_at': {'$lte': 0}, 'locked_until': {'$lte': 0}}),
+        ('habit_completions_collection', {'chat_id': 0, 'habit_id': 1, 'day': '2000-01-01'}),
+        ('habit_completions_collection', {'chat_id': 0, 'habit_id': 1, 'day': {'$gte': '2000-01-01'}}),
+        ('habit_completions_collection', {'chat_id': 0, 'day': '2000-01-01'}),
+        ('habit_completions_collection', {'chat_id': 0, 'day': {'$gte': '2000-01-01', '$lte': '2000-12-31'}}),
+        ('media_collection', {'name': ''}),
+        ('states_collection', {'key': 0}),
+        ('rollups_collection', {'chat_id': 0, 'week': '2000-W01'}),
+        # Weekly reports of all users at once (ReportManager.generate_weekly_reports)
+        ('rollups_collection', {'week': '2000-W01'}),
+    ]
+
+    def __init__(self, db):
+        self.db = db
+
+    async def ensure_indexes(self):
+        await self.drop_obsolete_indexes()
+        for collection_name, indexes in self.INDEXES.items():
+            collection = getattr(self.db, collection_name)
+            try:
+                await collection.create_indexes(indexes)
+            except OperationFailure as e:
+                # A unique index fails to build while duplicates or documents without a 'day'
+                # are still stored; run 'python migration_manager.py dates' first.
+                print(f"Could not create indexes on {collection.name}: {e}")
+
+    async def drop_obsolete_indexes(self):
+        for collection_name, index_names in self.OBSOLETE_INDEXES.items():
+            collection = getattr(self.db, collection_name)
+            existing = await collection.index_information()
+            for index_name in index_names:
+                if index_name in existing:
+                    await collection.drop_index(index_name)
+
+    async def check_query_plans(self):
+        """Return the (collection, filter) shapes whose winning plan still contains a COLLSCAN."""
+        collscans = []
+        for collection_name, query in self.QUERY_SHAPES:
+            collection = getattr(self.db, collection_name)
+            plan = await collection.find(query).explain()
+            if self._has_stage(plan['queryPlanner']['winningPlan'], 'COLLSCAN'):
+                collscans.append((collection.name, query))
+        return collscans
+
+    @classmethod
+    def _has_stage(cls, plan, stage):
+        if isinstance(plan, dict):
+            if plan.get('stage') == stage:
+                return True
+            return any(cls._has_stage(value, stage) for value in plan.values())
+        if isinstance(plan, list):
+            return any(cls._has_stage(value, stage) for value in plan)
+        return False
+
+
+async def run(check=False):
+    from database_manager import DatabaseManager, connection_string_from_env
+
+    index_manager = IndexManager(DatabaseManager(connection_string_from_env()))
+    await index_manager.ensure_indexes()
+    print('Indexes are up to date.')
+
+    if check:
+        collscans = await index_manager.check_query_plans()
+        for collection_name, query in collscans:
+            print(f"COLLSCAN on {collection_name} for {query}")
+        if collscans:
+            return 1
+        print('Every query shape is served by an index.')
+    return 0
+
+
+if __name__ == '__main__':
+    # python index_manager.py [--check]
+    sys.exit(asyncio.run(run(check='--check' in sys.argv[1:])))
@@ -0,0 +1,98 @@
+import os
+import asyncio
+import hashlib
+from telegram.error import BadRequest
+
+
+class MediaManager:
+    """Sends the bot's static assets by the Telegram file_id of their first upload.
+
+    file_ids are stored in Mongo next to the sha256 of the file they were uploaded from,
+    so an asset whose content changes on disk is uploaded again on its next send.
+    """
+
+    # Telegram's texts for unusable ids, e.g. "Wrong file identifier/http url specified",
+    # "Wrong remote file identifier specified" and "File_id doesn't match"
+    FILE_ID_ERRORS = ('file identifier', 'file_id', 'file id')
+
+    def __init__(self, db, directory):
+        self.db = db
+        self.directory = directory
+        # name -> (mtime_ns, size, sha256), so unchanged files are not hashed again
+        self.hashes = {}
+        # name -> (sha256, file_id)
+        self.file_ids = {}
+        self.locks = {}
+
+    async def send_document(self, bot, chat_id, name):
+        return await self._send(bot.send_document, 'document', chat_id, name)
+
+    async def send_video(self, bot, chat_id, name):
+        return await self._send(bot.send_video, 'video', chat_id, name)
+
+    async def _send(self, send, kind, chat_id, name):
+        path = os.path.join(self.directory, name)
+        sha256 = await self._content_hash(name, path)
+
+        file_id = await self._get_file_id(name, sha256)
+        if file_id:
+            try:
+                return await send(chat_id=chat_id, **{kind: file_id})
+            except BadRequest as e:
+                # Other bad requests (chat not found, ...) say nothing about the stored file
+                if not self._is_file_id_error(e):
+                    raise
+                # The file_id is unknown to Telegram (e.g. a different bot token); upload again
+                print(f"Stored file_id of {name} was rejected: {e}")
+                await self._forget(name, file_id)
+
+        async with self.locks.setdefault(name, asyncio.Lock()):
+            # Another /start may have uploaded the asset while this one waited
+            file_id = await self._get_file_id(name, sha256)
+            if file_id:
+                return await send(chat_id=chat_id, **{kind: file_id})
+
+            with open(path, 'rb') as asset:
+                message = await send(chat_id=chat_id, **{kind: asset})
+            file_id = getattr(message, kind).file_id
+            self.file_ids[name] = (sha256, file_id)
+            await self.db.save_media(name, sha256, file_id)
+            return message
+
+    @classmethod
+    def _is_file_id_error(cls, error):
+        message = str(error).lower()
+        return any(text in message for text in cls.FILE_ID_ERRORS)
+
+    async def _get_file_id(self, name, sha256):
+        if name not in self.file_ids:
+            media = await self.db.get_media(name)
+            if media:
+                self.file_ids[name] = (media['sha256'], media['file_id'])
+
+        stored_sha256, file_id = self.file_ids.get(name, (None, None))
+        return file_id if stored_sha256 == sha256 else None
+
+    async def _forget(self, name, file_id):
+        if self.file_ids.get(name, (None, None))[1] == file_id:
+            del self.file_ids[name]
+        await self.db.delete_media(name, file_id)
+
+    async def _content_hash(self, name, path):
+        stat = os.stat(path)
+        cached = self.hashes.get(name)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+
+        # The tutorial video is several MB; hashing it on the event loop would stall every chat
+        sha256 = await asyncio.to_thread(self._hash_file, path)
+        self.hashes[name] = (stat.st_mtime_ns, stat.st_size, sha256)
+        return sha256
+
+    @staticmethod
+    def _hash_file(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as asset:
+            for chunk in iter(lambda: asset.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
@@ -0,0 +1,248 @@
+import sys
+import asyncio
+from datetime import datetime
+from collections import defaultdict
+from pymongo import UpdateOne, ReplaceOne, DeleteOne
+from database_manager import DAY_FORMAT, LEGACY_DATE_FORMAT, week_key
+
+
+class MigrationManager:
+    # Collections whose documents carry a legacy '%d-%m-%Y' date
+    DATED_COLLECTIONS = [
+        'tasks_collection',
+        'notes_collection',
+        'moods_collection',
+        'habits_collection',
+        'quotes_collection',
+        'graphs_collection',
+        'counter_collection',
+        'journal_collection',
+        'ratings_collection',
+    ]
+
+    # Fields besides 'day' of the unique index each dated collection gets (IndexManager.INDEXES)
+    UNIQUE_DAY_KEYS = {
+        'tasks_collection': ('chat_id', 'id'),
+        'notes_collection': ('chat_id', 'id'),
+        'moods_collection': ('chat_id',),
+        'quotes_collection': ('chat_id',),
+        'counter_collection': ('chat_id',),
+        'journal_collection': ('chat_id', 'user_name'),
+        'ratings_collection': ('chat_id',),
+    }
+
+    def __init__(self, db, batch_size=500, pdf_batch_size=50):
+        self.db = db
+        self.batch_size = batch_size
+        self.pdf_batch_size = pdf_batch_size
+
+    async def migrate_dates(self):
+        """Add the ISO 'day' key to every document that only has the legacy 'date' string.
+
+        Run it with the bot stopped (stop, migrate, then start the new version). The new version writes
+        'day' documents and starts a day's counter at 1, so what it stored for a day before that day's
+        legacy documents were migrated collides with them: the same task or note ids, a second mood,
+        rating, quote or counter. A colliding legacy counter is merged into the day's counter, keeping
+        the higher id counters so later ids skip the legacy ones; other colliding legacy documents are
+        left as they are and reported, and their count is returned so the unique indexes are not built
+        over them unnoticed. The batches walk _id order, so an interrupted run simply resumes.
+        """
+        collisions = 0
+        for collection_name in self.DATED_COLLECTIONS:
+            collection = getattr(self.db, collection_name)
+            key_fields = self.UNIQUE_DAY_KEYS.get(collection_name, ())
+            query = {'day': {'$exists': False}, 'date': {'$type': 'string'}}
+            # Counters are merged field by field, so they are read whole
+            merge = collection_name == 'counter_collection'
+            projection = None if merge else dict.fromkeys(('date',) + key_fields, 1)
+            migrated = 0
+            skipped = 0
+            last_id = None
+
+            while True:
+                if last_id is not None:
+                    query['_id'] = {'$gt': last_id}
+                batch = await collection.find(query, projection).sort('_id', 1).to_list(self.batch_size)
+                if not batch:
+                    break
+                last_id = batch[-1]['_id']
+
+                days = {}
+                for doc in batch:
+                    try:
+                        days[doc['_id']] = datetime.strptime(doc['date'], LEGACY_DATE_FORMAT).strftime(DAY_FORMAT)
+                    except ValueError:
+                        print(f"Skipping {collection.name} {doc['_id']} with unparsable date {doc['date']!r}")
+
+                taken = set()
+                if key_fields and days:
+                    existing = collection.find(
+                        {'day': {'$in': list(set(days.values()))},
+                         'chat_id': {'$in': list({doc.get('chat_id') for doc in batch})}},
+                        dict.fromkeys(('day',) + key_fields, 1),
+                    )
+                    async for doc in existing:
+                        taken.add((doc['day'],) + tuple(doc.get(field) for field in key_fields))
+
+                operations = []
+                for doc in batch:
+                    day = days.get(doc['_id'])
+                    if day is None:
+                        continue
+                    if key_fields:
+                        key = (day,) + tuple(doc.get(field) for field in key_fields)
+                        if key in taken and merge:
+                            operations += self._merge_counter(doc, day)
+                            continue
+                        if key in taken:
+                            print(f"Skipping {collection.name} {doc['_id']}: a document with 'day' already exists "
+                                  f"for {dict(zip(('day',) + key_fields, key))}")
+                            skipped += 1
+                            continue
+                        taken.add(key)
+                    operations.append(UpdateOne({'_id': doc['_id']}, {'$set': {'day': day}}))
+
+                if operations:
+                    result = await collection.bulk_write(operations, ordered=False)
+                    migrated += result.modified_count
+
+            print(f"{collection.name}: {migrated} documents migrated, {skipped} skipped as collisions")
+            collisions += skipped
+        return collisions
+
+    @staticmethod
+    def _merge_counter(doc, day):
+        fields = {}
+        for field, value in doc.items():
+            if field.endswith('_counter') or field.startswith('completed_'):
+                fields[field] = {'$max': [f'${field}', value]}
+            elif field == 'mood_score':
+                # The mood saved since the upgrade wins
+                fields[field] = {'$ifNull': [f'${field}', value]}
+        operations = [DeleteOne({'_id': doc['_id']})]
+        if fields:
+            operations.insert(0, UpdateOne({'chat_id': doc['chat_id'], 'day': day}, [{'$set': fields}]))
+        return operations
+
+    async def migrate_inline_pdfs(self):
+        """Move PDFs stored inline in journals documents into the blob store, leaving a reference."""
+        collection = self.db.journal_collection
+        query = {'pdf_data': {'$exists': True}}
+        migrated = 0
+        last_id = None
+
+        while True:
+            if last_id is not None:
+                query['_id'] = {'$gt': last_id}
+            batch = await collection.find(query, {'pdf_data': 1}).sort('_id', 1).to_list(self.pdf_batch_size)
+            if not batch:
+                break
+            last_id = batch[-1]['_id']
+
+            operations = []
+            for doc in batch:
+                pdf_data = bytes(doc['pdf_data'])
+                blob_key = await self.db.blob_store.put(pdf_data)
+                operations.append(UpdateOne(
+                    {'_id': doc['_id']},
+                    {'$set': {'blob': self.db.blob_reference(blob_key, pdf_data)}, '$unset': {'pdf_data': ''}}
+                ))
+
+            result = await collection.bulk_write(operations, ordered=False)
+            migrated += result.modified_count
+
+        print(f"{collection.name}: {migrated} inline PDFs moved to the {self.db.blob_store.name} blob store")
+
+    async def rebuild_rollups(self):
+        """Recompute every weekly_rollups document from the raw counters, tasks, ratings and habit logs.
+
+        habits_active is the number of the chat's habits created on or before each day and not deleted
+        by then; habits hard-deleted before soft deletion are not known anymore. Only days that left
+        some record are rebuilt.
+        """
+        days = defaultdict(dict)
+
+        async for counter in self.db.counter_collection.find({'day': {'$exists': True}}):
+            figures = days[(counter['chat_id'], counter['day'])]
+            figures['habits_completed'] = counter.get('completed_habits', 0)
+            if 'mood_score' in counter:
+                figures['mood_score'] = counter['mood_score']
+
+        # Both task figures come from the tasks still stored, as delete_task removes a task from both;
+        # the completed_tasks counter of older days also counts deleted tasks
+        pipeline = [{'$group': {
+            '_id': {'chat_id': '$chat_id', 'day': '$day'},
+            'tasks': {'$sum': 1},
+            'completed': {'$sum': {'$cond': [{'$eq': ['$completed', True]}, 1, 0]}},
+        }}]
+        async for entry in self.db.tasks_collection.aggregate(pipeline, allowDiskUse=True):
+            if entry['_id'].get('day'):
+                figures = days[(entry['_id']['chat_id'], entry['_id']['day'])]
+                figures['tasks_created'] = entry['tasks']
+                figures['tasks_completed'] = entry['completed']
+
+        # Habits completed before the habit_completions log only left the counter behind
+        pipeline = [{'$group': {'_id': {'chat_id': '$chat_id', 'day': '$day'}, 'habits': {'$sum': 1}}}]
+        async for entry in self.db.habit_completions_collection.aggregate(pipeline, allowDiskUse=True):
+            figures = days[(entry['_id']['chat_id'], entry['_id']['day'])]
+            figures['habits_completed'] = max(figures.get('habits_completed', 0), entry['habits'])
+
+        async for rating in self.db.ratings_collection.find({'day': {'$exists': True}}):
+            days[(rating['chat_id'], rating['day'])]['rating'] = rating.get('score', 0)
+
+        habit_spans = defaultdict(list)
+        async for habit in self.db.habits_collection.find({}, {'chat_id': 1, 'day': 1, 'deleted_day': 1}):
+            # Habits saved before the 'day' key existed count from the beginning
+            habit_spans[habit['chat_id']].append((habit.get('day', ''), habit.get('deleted_day')))
+
+        weeks = defaultdict(dict)
+        for (chat_id, day), figures in days.items():
+            habits_active = sum(1 for created, deleted in habit_spans.get(chat_id, [])
+                                if created <= day and (deleted is None or deleted > day))
+            if habits_active:
+                figures['habits_active'] = max(habits_active, figures.get('habits_completed', 0))
+            weeks[(chat_id, week_key(day))][day] = figures
+
+        operations = [
+            ReplaceOne({'chat_id': chat_id, 'week': week}, {'chat_id': chat_id, 'week': week, 'days': week_days},
+                       upsert=True)
+            for (chat_id, week), week_days in weeks.items()
+        ]
+        for start in range(0, len(operations), self.batch_size):
+            await self.db.rollups_collection.bulk_write(operations[start:start + self.batch_size], ordered=False)
+
+        print(f"{self.db.rollups_collection.name}: {len(operations)} weekly rollups rebuilt")
+
+
+async def run(migration):
+    from index_manager import IndexManager
+    from database_manager import DatabaseManager, connection_string_from_env
+
+    database_manager = DatabaseManager(connection_string_from_env())
+    migration_manager = MigrationManager(database_manager)
+
+    if migration == 'dates':
+        if await migration_manager.migrate_dates():
+            # Building the unique indexes would only fail on them
+            print("Some legacy documents collide with documents the bot wrote since the upgrade; "
+                  "merge or remove them, then run the migration again.")
+            return 1
+    elif migration == 'pdfs':
+        await migration_manager.migrate_inline_pdfs()
+    elif migration == 'rollups':
+        await migration_manager.rebuild_rollups()
+    else:
+        print(f"Unknown migration: {migration}")
+        return 1
+
+    # Unique indexes on the new keys can only be built once every document has them
+    await IndexManager(database_manager).ensure_indexes()
+    return 0
+
+
+if __name__ == '__main__':
+    # python migration_manager.py dates|pdfs|rollups
+    if len(sys.argv) != 2:
+        print("Usage: python migration_manager.py <migration>")
+        sys.exit(2)
+    sys.exit(asyncio.run(run(sys.argv[1])))
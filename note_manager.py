@@ -15,7 +15,7 @@ class NoteManager:
         chat_id = update.message.chat_id
         note_content = update.message.text.strip()
 
-        note_id = self.db.save_note(chat_id, note_content)
+        note_id = await self.db.save_note(chat_id, note_content)
 
         context.user_data[chat_id]['state'] = ''
         await update.message.reply_text(f"Note №:{note_id} was added.")
@@ -23,7 +23,7 @@ class NoteManager:
     async def show_notes(self, update: Update, context: CallbackContext):
         chat_id = update.message.chat_id
 
-        notes = self.db.get_notes(chat_id)
+        notes = await self.db.get_notes(chat_id)
 
         if notes:
             note_content = "\n".join([f"{note['id']}. {note['content']}" for note in notes])
@@ -36,7 +36,7 @@ class NoteManager:
     async def delete_note(self, update: Update, context: CallbackContext):
         chat_id = update.message.chat_id
 
-        notes = self.db.get_notes(chat_id)
+        notes = await self.db.get_notes(chat_id)
         if notes:
             context.user_data[chat_id] = {'state': 'delete_note'}
             notes_text = "\n".join([f"{note['id']}. {note['content']}" for note in notes])
@@ -51,10 +51,9 @@ class NoteManager:
 
         try:
             note_id = int(user_input)
-            note = self.db.note_exists(chat_id, note_id)
+            result = await self.db.delete_note(chat_id, note_id)
 
-            if note:
-                self.db.delete_note(chat_id, note_id)
+            if result.matched:
                 context.user_data[chat_id]['state'] = ''
                 await update.message.reply_text(f"The note №:{note_id} has been removed!")
             else:
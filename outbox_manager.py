@@ -0,0 +1,125 @@
+import uuid
+import asyncio
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from database_manager import DAY_FORMAT
+
+
+class OutboxManager:
+    """Durable queue of satisfaction-graph writes, drained in the background by drain().
+
+    Entries are keyed so that repeated writes coalesce: one 'create_graph' per chat and one
+    pixel write ('insert_data' or 'update_data') per (chat, day), the latest quantity winning.
+    """
+
+    def __init__(self, db, commit_manager, batch_size=50, lease_seconds=120, max_attempts=20,
+                 retry_delay=30, max_delay=3600):
+        self.db = db
+        self.commit_manager = commit_manager
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+
+    async def create_graph(self, chat_id, user_name):
+        await self._enqueue(f"{chat_id}:graph", {'op': 'create_graph', 'chat_id': chat_id, 'user_name': user_name})
+
+    async def insert_data(self, chat_id, user_name, quantity, date=None):
+        if date is None:
+            date = self.db.get_current_date()
+        await self._enqueue(f"{chat_id}:{date}", {
+            'op': 'insert_data', 'chat_id': chat_id, 'user_name': user_name, 'day': date, 'quantity': quantity})
+
+    async def update_data(self, chat_id, user_name, quantity, date):
+        await self._enqueue(f"{chat_id}:{date}", {
+            'op': 'update_data', 'chat_id': chat_id, 'user_name': user_name, 'day': date, 'quantity': quantity})
+
+    async def _enqueue(self, key, entry):
+        now = datetime.utcnow()
+        update = {
+            '$set': {**entry, 'attempts': 0, 'next_attempt_at': now},
+            '$inc': {'version': 1},
+            '$setOnInsert': {'created_at': now, 'locked_until': now},
+        }
+        try:
+            await self.db.outbox_collection.update_one({'key': key}, update, upsert=True)
+        except DuplicateKeyError:
+            await self.db.outbox_collection.update_one({'key': key}, update)
+
+    async def drain(self, context=None):
+        """Send every due entry, one claimed batch at a time. Used as a job_queue callback."""
+        while True:
+            batch = await self._claim_batch()
+            if not batch:
+                return
+
+            # Graphs are created before pixels are written to them
+            graphs = [entry for entry in batch if entry['op'] == 'create_graph']
+            pixels = [entry for entry in batch if entry['op'] != 'create_graph']
+            await asyncio.gather(*(self._dispatch(entry) for entry in graphs))
+            await asyncio.gather(*(self._dispatch(entry) for entry in pixels))
+
+            if len(batch) < self.batch_size:
+                return
+
+    async def _claim_batch(self):
+        now = datetime.utcnow()
+        due = {'next_attempt_at': {'$lte': now}, 'locked_until': {'$lte': now}}
+        candidates = await self.db.outbox_collection.find(due, {'_id': 1}) \
+            .sort('next_attempt_at', 1).to_list(self.batch_size)
+        if not candidates:
+            return []
+
+        # The claim token makes sure two workers never send the same entry
+        claim = uuid.uuid4().hex
+        ids = [candidate['_id'] for candidate in candidates]
+        await self.db.outbox_collection.update_many(
+            {'_id': {'$in': ids}, **due},
+            {'$set': {'claimed_by': claim, 'locked_until': now + self.lease}}
+        )
+        return await self.db.outbox_collection.find({'_id': {'$in': ids}, 'claimed_by': claim}).to_list(None)
+
+    async def _dispatch(self, entry):
+        try:
+            sent = await self._send(entry)
+        except Exception as e:
+            print(f"An error occurred while sending {entry['op']} for {entry['chat_id']}: {e}")
+            sent = False
+
+        # Matching the version leaves entries coalesced during the send for the next drain
+        query = {'_id': entry['_id'], 'version': entry['version']}
+        if sent:
+            await self.db.outbox_collection.delete_one(query)
+        elif entry['attempts'] + 1 >= self.max_attempts:
+            print(f"Giving up on {entry['op']} for {entry['chat_id']} after {self.max_attempts} attempts")
+            await self.db.outbox_collection.delete_one(query)
+        else:
+            now = datetime.utcnow()
+            delay = min(self.max_delay, self.retry_delay * 2 ** entry['attempts'])
+            await self.db.outbox_collection.update_one(query, {
+                '$inc': {'attempts': 1},
+                '$set': {'next_attempt_at': now + timedelta(seconds=delay), 'locked_until': now},
+            })
+
+    async def _send(self, entry):
+        chat_id = entry['chat_id']
+        user_name = entry['user_name']
+
+        if entry['op'] == 'create_graph' or not await self.db.get_graph(chat_id):
+            graph = await self.commit_manager.create_graph(user_name)
+            if graph:
+                await self.db.save_graph(chat_id, user_name, graph)
+            elif entry['op'] == 'create_graph':
+                return False
+
+        if entry['op'] == 'create_graph':
+            return True
+
+        graph_date = datetime.strptime(entry['day'], DAY_FORMAT).strftime("%Y%m%d")
+        if entry['op'] == 'update_data':
+            link = await self.commit_manager.update_data(user_name, entry['quantity'], graph_date)
+        else:
+            link = await self.commit_manager.insert_data(user_name, entry['quantity'], max_retries=3,
+                                                         insert_date=graph_date)
+        return link is not None
@@ -1,6 +1,9 @@
 import os
 import io
+import asyncio
+import multiprocessing
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from reportlab.pdfgen import canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.lib.pagesizes import letter
@@ -15,15 +18,31 @@ font_path = os.path.join(script_directory, 'Fonts')
 pdfmetrics.registerFont(TTFont('Symbola', os.path.join(font_path, 'Symbola.ttf')))
 pdfmetrics.registerFont(TTFont('DejaVuSans', os.path.join(font_path, 'DejaVuSans.ttf')))
 
+template_path = os.path.join(script_directory, 'utilities', 'day.pdf')
+_template_page = None
 
-class PDFManager:
 
-    def __init__(self, db):
-        self.db = db
+def get_template_page():
+    # The journal background never changes, so it is read and parsed once per process.
+    # PdfWriter.add_page clones it, which keeps this copy clean for the next render.
+    global _template_page
+    if _template_page is None:
+        with open(template_path, 'rb') as template_file:
+            _template_page = PdfReader(io.BytesIO(template_file.read())).pages[0]
+    return _template_page
+
+
+def render_journal(snapshot):
+    # Process pool entry point: plain data in, PDF bytes out
+    return JournalRenderer().render(snapshot)
+
+
+class JournalRenderer:
+
+    def __init__(self):
         self.packet = io.BytesIO()
         self.can = canvas.Canvas(self.packet, pagesize=letter)
         self.can.setFont("DejaVuSans", 11)
-        self.output_folder = os.path.join(script_directory, 'OutputPDFs')
 
     @staticmethod
     def split_note(long_text, max_line_length=32):
@@ -42,62 +61,53 @@ class PDFManager:
         result = "\n".join(lines)
         return result
 
-    def pdf_write(self, chat_id, user_name):
-        user_tasks = self.db.get_tasks(chat_id)
+    def render(self, snapshot):
+        user_tasks = snapshot['tasks']
         if user_tasks:
             action_tasks = [
                 f"●  {task['description']}"
                 for task in user_tasks
-                if 'completed' not in task or not task['completed']]
+                if not task['completed']]
             completed_tasks = [
-                f"●  {task['description']} ✔  ({task.get('time', 'N/A')})"
+                f"●  {task['description']} ✔  ({task['time']})"
                 for task in user_tasks
-                if 'completed' in task and task['completed']
+                if task['completed']
             ]
             completed_tasks.extend(action_tasks)
             self.write_down(54, 621, completed_tasks)
 
-        user_habits = self.db.get_habits(chat_id)
+        user_habits = snapshot['habits']
         if user_habits:
             habits_list = [
                 f"●  {habit['description']}"
                 for habit in user_habits
-                if 'completed' not in habit or not habit['completed']]
+                if not habit['completed']]
             completed_habits = [
-                f"●  {habit['description']} ✔  ({habit.get('time', 'N/A')})"
+                f"●  {habit['description']} ✔  ({habit['time']})"
                 for habit in user_habits
-                if 'completed' in habit and habit['completed']
+                if habit['completed']
             ]
             completed_habits.extend(habits_list)
             self.write_down(54, 165, completed_habits)
 
-        user_notes = self.db.get_notes(chat_id)
+        user_notes = snapshot['notes']
         if user_notes:
             note_list = [f"●  {note['content']}    ({note['time']})" for note in user_notes]
             self.write_down(336, 621, note_list)
 
-        user_quote = self.db.get_quote(chat_id)
-        if user_quote:
-            quote = user_quote[0].get('quote', '')
-            self.insert_quote(336, 165, quote)
+        if snapshot['quote'] is not None:
+            self.insert_quote(336, 165, snapshot['quote'])
 
-        user_mood = self.db.get_mood(chat_id)
-        if user_mood:
-            mood = user_mood[0].get('mood', '')
-            self.insert_emoji(374, 758, mood)
+        if snapshot['mood'] is not None:
+            self.insert_emoji(374, 758, snapshot['mood'])
 
-        user_rating = self.db.get_rating(chat_id)
-        if user_rating:
-            score = user_rating[0].get('score', '')
-            self.insert_score(515, 758, score)
+        if snapshot['score'] is not None:
+            self.insert_score(515, 758, snapshot['score'])
 
-        user_state = self.db.get_state(chat_id)
-        if user_state:
-            self.insert_state(115, 28, user_state)
+        if snapshot['state']:
+            self.insert_state(115, 28, snapshot['state'])
 
-        #we return a tuple containing the PDF data (from pdf_data_buffer.getvalue()) and the filename
-        output_filename = self.locate_inputs(chat_id, user_name)
-        return output_filename
+        return self.merge_template(snapshot['date_label'])
 
     def write_down(self, x, y, user_input_list):
         y_coordinate = y
@@ -142,30 +152,116 @@ class PDFManager:
 
         self.can.drawText(text_object)
 
-    def locate_inputs(self, chat_id, user_name):
+    def merge_template(self, date_label):
         self.can.setFont("DejaVuSans", 14)
-        self.can.drawString(373, 707, datetime.now().strftime("%d / %b / %Y   (%a)"))
+        self.can.drawString(373, 707, date_label)
 
         self.can.save()
 
         self.packet.seek(0)
 
-        existing_pdf = PdfReader(open("utilities/day.pdf", "rb"))
-
         new_pdf = PdfWriter()
 
-        page = existing_pdf.pages[0]
+        page = new_pdf.add_page(get_template_page())
         page.merge_page(PdfReader(self.packet).pages[0])
-        new_pdf.add_page(page)
 
         pdf_data_buffer = io.BytesIO()
         new_pdf.write(pdf_data_buffer)
 
-        timestamp = datetime.now().strftime("%d_%m_%Y (%M-%S)")
-        filename = f"{user_name} {timestamp}.pdf"
+        return pdf_data_buffer.getvalue()
+
+
+class RenderPool:
+    """Runs render_journal in worker processes, at most max_concurrent journals at a time."""
+
+    def __init__(self, max_workers=None, max_concurrent=None):
+        self.max_workers = max_workers or int(os.getenv("PDF_WORKERS", 2))
+        self.max_concurrent = max_concurrent or int(os.getenv("PDF_MAX_CONCURRENT", self.max_workers))
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        self.executor = None
+        self.waiting = 0
+        self.rendering = 0
+
+    @property
+    def queue_depth(self):
+        return self.waiting
+
+    def stats(self):
+        return {'workers': self.max_workers, 'rendering': self.rendering, 'waiting': self.waiting}
+
+    async def render(self, snapshot):
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.rendering += 1
+        try:
+            if self.executor is None:
+                # spawn, not fork: the parent already runs the Motor and Telegram client threads
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                    mp_context=multiprocessing.get_context('spawn'),
+                                                    initializer=get_template_page)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, render_journal, snapshot)
+        finally:
+            self.rendering -= 1
+            self.semaphore.release()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
 
-        self.db.save_pdf(chat_id, user_name, pdf_data_buffer.getvalue(), filename)
 
-        return pdf_data_buffer.getvalue(), filename
+class PDFManager:
+
+    def __init__(self, db, render_pool):
+        self.db = db
+        self.render_pool = render_pool
+        self.output_folder = os.path.join(script_directory, 'OutputPDFs')
+
+    async def get_snapshot(self, chat_id):
+        day = await self.db.get_day_snapshot(chat_id)
+        user_tasks = day['tasks']
+        user_habits = day['habits']
+        user_notes = day['notes']
+        user_quote = day['quotes']
+        user_mood = day['moods']
+        user_rating = day['ratings']
+        user_state = day['state']
+
+        return {
+            'tasks': [self._checklist_item(task) for task in user_tasks],
+            'habits': [self._checklist_item(habit) for habit in user_habits],
+            'notes': [{'content': note['content'], 'time': note['time']} for note in user_notes],
+            'quote': user_quote[0].get('quote', '') if user_quote else None,
+            'mood': user_mood[0].get('mood', '') if user_mood else None,
+            'score': user_rating[0].get('score', '') if user_rating else None,
+            'state': user_state or '',
+            'date_label': datetime.now().strftime("%d / %b / %Y   (%a)"),
+        }
+
+    @staticmethod
+    def _checklist_item(doc):
+        return {
+            'description': doc['description'],
+            'completed': bool(doc.get('completed', False)),
+            'time': doc.get('time', 'N/A'),
+        }
+
+    async def pdf_write(self, chat_id, user_name):
+        snapshot = await self.get_snapshot(chat_id)
+
+        if self.render_pool.queue_depth:
+            print(f"PDF render queue depth: {self.render_pool.queue_depth}")
+        pdf_data = await self.render_pool.render(snapshot)
+
+        timestamp = datetime.now().strftime("%d_%m_%Y (%M-%S)")
+        filename = f"{user_name} {timestamp}.pdf"
 
+        await self.db.save_pdf(chat_id, user_name, pdf_data, filename)
 
+        #we return a tuple containing the PDF data and the filename
+        return pdf_data, filename
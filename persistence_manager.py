@@ -0,0 +1,157 @@
+import os
+import copy
+import time
+import asyncio
+from datetime import datetime
+from pymongo import UpdateOne
+from telegram import Update
+from telegram.ext import CallbackContext, TypeHandler
+
+
+class MemoryStateStore:
+    """Conversation states in this process only; a restart forgets them.
+
+    A state not saved again within ttl seconds expires, like the Mongo store's TTL index.
+    """
+
+    def __init__(self, ttl=86400):
+        self.ttl = ttl
+        self.states = {}
+
+    async def load(self, key):
+        entry = self.states.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.states.pop(key, None)
+            return None
+        return copy.deepcopy(entry[1])
+
+    async def save(self, key, data):
+        now = time.monotonic()
+        # Re-inserting keeps self.states ordered by expiry, so the expired states are always at the front
+        self.states.pop(key, None)
+        self.states[key] = (now + self.ttl, copy.deepcopy(data))
+        self._purge(now)
+
+    def _purge(self, now):
+        # Drops the states of users who never came back, not just those loaded again
+        while self.states:
+            key, (expires, _) = next(iter(self.states.items()))
+            if expires >= now:
+                break
+            del self.states[key]
+
+    async def close(self):
+        pass
+
+
+class MongoStateStore:
+    """Conversation states shared by every bot process through Mongo.
+
+    Saves are buffered and written together every flush_interval seconds, the latest state of a
+    user winning, and a process reads its own buffered states back. States nobody touched for the
+    TTL of the conversation_states index (IndexManager.STATE_TTL) are removed by Mongo.
+    """
+
+    def __init__(self, collection, flush_interval=0.2):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.pending = {}
+        # States handed to bulk_write that Mongo has not acknowledged yet
+        self.in_flight = {}
+        self.flusher = None
+
+    async def load(self, key):
+        for buffered in (self.pending, self.in_flight):
+            if key in buffered:
+                return copy.deepcopy(buffered[key])
+        doc = await self.collection.find_one({'key': key}, {'data': 1})
+        # BSON only has string keys, so dict items are stored as [key, value] pairs
+        return dict(doc['data']) if doc else None
+
+    async def save(self, key, data):
+        self.pending[key] = copy.deepcopy(data)
+        if self.flusher is None:
+            self.flusher = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        try:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+        finally:
+            # close() detaches the flusher first, so nothing is rescheduled after it
+            if self.flusher is asyncio.current_task():
+                self.flusher = None
+                if self.pending:
+                    self.flusher = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        self.in_flight.update(pending)
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne({'key': key}, {'$set': {'data': [[k, v] for k, v in data.items()], 'updated_at': now}},
+                      upsert=True)
+            for key, data in pending.items()
+        ]
+        try:
+            await self.collection.bulk_write(operations, ordered=False)
+        except BaseException as e:
+            # Keep them for the next flush unless newer states were saved meanwhile
+            for key, data in pending.items():
+                self.pending.setdefault(key, data)
+            if not isinstance(e, Exception):
+                raise
+            print(f"An error occurred while saving {len(operations)} conversation states: {e}")
+        finally:
+            for key, data in pending.items():
+                if self.in_flight.get(key) is data:
+                    del self.in_flight[key]
+
+    async def close(self):
+        flusher, self.flusher = self.flusher, None
+        if flusher is not None:
+            flusher.cancel()
+            await asyncio.gather(flusher, return_exceptions=True)
+        await self.flush()
+
+
+def state_store_from_env(db):
+    if os.getenv("STATE_STORE", "mongo") == "memory":
+        return MemoryStateStore()
+    return MongoStateStore(db.states_collection, flush_interval=float(os.getenv("STATE_FLUSH_INTERVAL", 0.2)))
+
+
+class PersistenceManager:
+    """Loads context.user_data from the state store before the handlers run and saves it after."""
+
+    LOAD_GROUP = -1
+    SAVE_GROUP = 100
+
+    def __init__(self, store):
+        self.store = store
+        # user id -> user_data as loaded, to skip saving unchanged states
+        self.loaded = {}
+
+    def register(self, app):
+        app.add_handler(TypeHandler(Update, self.load), group=self.LOAD_GROUP)
+        app.add_handler(TypeHandler(Update, self.save), group=self.SAVE_GROUP)
+
+    async def load(self, update: Update, context: CallbackContext):
+        if update.effective_user is None:
+            return
+        data = await self.store.load(update.effective_user.id) or {}
+        context.user_data.clear()
+        context.user_data.update(data)
+        self.loaded[update.effective_user.id] = copy.deepcopy(data)
+
+    async def save(self, update: Update, context: CallbackContext):
+        if update.effective_user is None:
+            return
+        user_id = update.effective_user.id
+        if self.loaded.pop(user_id, None) != context.user_data:
+            await self.store.save(user_id, dict(context.user_data))
+
+    async def close(self):
+        await self.store.close()
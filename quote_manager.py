@@ -1,16 +1,33 @@
+import os
 import random
 
 
+script_directory = os.path.dirname(os.path.realpath(__file__))
+quotes_path = os.path.join(script_directory, 'utilities', 'quotes.txt')
+
+
 class QuoteManager():
 
-    def __init__(self, db):
+    def __init__(self, db, path=quotes_path):
         self.db = db
+        # The corpus is read once; a tuple keeps it compact and indexable for random.choice
+        self.quotes = self.load_quotes(path)
+
+    @staticmethod
+    def load_quotes(path):
+        with open(path, encoding='utf-8') as quotes_files:
+            return tuple(line.strip() for line in quotes_files if line.strip())
 
-    def get_quote(self, chat_id):
-        with open("utilities/quotes.txt", encoding='utf-8') as quotes_files:
-            quotes = quotes_files.readlines()
-            quote = random.choice(quotes)
-            self.db.save_quote(chat_id, quote)
-            return quote
+    def random_quote(self):
+        return random.choice(self.quotes)
 
+    async def get_quote(self, chat_id):
+        quote = self.random_quote()
+        await self.db.save_quote(chat_id, quote)
+        return quote
 
+    async def assign_daily_quotes(self, users):
+        # Picks today's quote for every user and stores them all in one bulk write
+        assignments = {user['chat_id']: self.random_quote() for user in users}
+        await self.db.save_quotes(assignments)
+        return assignments
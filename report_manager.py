@@ -1,68 +1,119 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+from database_manager import DAY_FORMAT, LEGACY_DATE_FORMAT
 
 
 class ReportManager:
+    # Telegram rejects messages longer than this many characters
+    MESSAGE_LIMIT = 4096
+
     def __init__(self, db):
         self.db = db
 
-    def _get_weekly_data_query(self, chat_id, end_date=None):
+    def _get_week_days(self, rollup, end_date=None):
+        # Per-day figures of a weekly rollup, up to and including end_date
+        if end_date is None:
+            end_date = self.db.get_current_date()
+        if not rollup:
+            return {}
+        return {day: figures for day, figures in rollup.get('days', {}).items() if day <= end_date}
+
+    async def _get_weekly_days(self, chat_id, end_date=None):
+        rollup = await self.db.get_weekly_rollup(chat_id, end_date)
+        return self._get_week_days(rollup, end_date)
+
+    def _build_weekly_reports(self, chat_id, week_days):
+        mood_levels = self._get_day_values(week_days, 'mood_score')
+        day_ratings = self._get_day_values(week_days, 'rating')
+        return {
+            'mood': self._build_mood_report(len(mood_levels), sum(mood_levels.values())),
+            'tasks': self._build_tasks_report(chat_id, self._sum_days(week_days, 'tasks_completed'),
+                                              self._sum_days(week_days, 'tasks_created')),
+            'habits': self._build_habits_report(chat_id, self._sum_days(week_days, 'habits_completed'),
+                                                self._sum_days(week_days, 'habits_active')),
+            'satisfaction': self._build_satisfaction_report(day_ratings) if day_ratings else None,
+        }
+
+    @staticmethod
+    def _get_day_values(week_days, field):
+        return {day: figures[field] for day, figures in week_days.items() if field in figures}
+
+    @staticmethod
+    def _sum_days(week_days, field):
+        return sum(figures.get(field, 0) for figures in week_days.values())
+
+    async def generate_weekly_reports(self, end_date=None):
+        """Yield (chat_id, reports) for every user with a rollup this week, read with one indexed query.
+
+        reports maps 'mood', 'tasks', 'habits' and 'satisfaction' to the same texts the
+        per-user generate_*_report methods return.
+        """
+        async for rollup in self.db.get_weekly_rollups(end_date):
+            chat_id = rollup['chat_id']
+            try:
+                yield chat_id, self._build_weekly_reports(chat_id, self._get_week_days(rollup, end_date))
+            except Exception as e:
+                print(f"Error with user {chat_id} in generate_weekly_reports: {e}")
+
+    def compose_weekly_report(self, reports):
+        """Join the reports generate_weekly_reports yields for one user into as few messages as fit the limit."""
+        sections = ["Hi, it's Friday! 🌞\nHere is your Weekly Report:"]
+        sections.extend(report for report in (reports.get('mood'), reports.get('tasks'), reports.get('habits'))
+                        if report)
+
+        if reports.get('satisfaction'):
+            sections.append("Now based on Your Own Daily Ratings we have🤩...\n\n" + reports['satisfaction'])
+        else:
+            sections.append("You do not have enough data 😞\n\n"
+                            "Please try using the bot more often\n"
+                            "To get weekly reports on your weekly:\n"
+                            "● Mood levels 😊\n"
+                            "● Tasks 📋\n"
+                            "● Habits 🌱\n\n"
+                            "Try /start to get started! 🤠")
+
+        return self._split_message("\n\n\n".join(sections))
+
+    def _split_message(self, text):
+        # Cut at the last paragraph or line break that fits, and mid-line only if there is none
+        messages = []
+        while len(text) > self.MESSAGE_LIMIT:
+            cut = text.rfind("\n\n", 0, self.MESSAGE_LIMIT)
+            if cut <= 0:
+                cut = text.rfind("\n", 0, self.MESSAGE_LIMIT)
+            if cut <= 0:
+                cut = self.MESSAGE_LIMIT
+            messages.append(text[:cut].rstrip())
+            text = text[cut:].lstrip("\n")
+        messages.append(text)
+        return messages
+
+    async def get_mood_levels(self, chat_id, end_date=None):
         try:
-            if end_date is None:
-                end_date = self.db.get_current_date()
-
-            end_date = datetime.strptime(end_date, "%d-%m-%Y")
-            start_date = end_date - timedelta(days=(end_date.weekday() + 1) % 7)  # SUNDAY
-
-            query = {
-                'chat_id': chat_id,
-                'date': {
-                    '$gte': start_date.strftime("%d-%m-%Y"),
-                    '$lte': end_date.strftime("%d-%m-%Y")
-                }
-            }
-            return query
-        except Exception as e:
-            print(f"Error in _get_weekly_data_query: {e}")
-            return None
-
-    def get_mood_levels(self, chat_id, end_date=None):
-        try:
-            query = self._get_weekly_data_query(chat_id, end_date)
-            if query is None:
-                return None
-
-            data = list(self.db.counter_collection.find(query))
-
-            if data:
-                mood_levels = {}
-                for entry in data:
-                    date = entry['date']
-                    mood_levels[date] = entry.get('mood_score', 0)
-
-                return mood_levels if mood_levels else None
+            mood_levels = self._get_day_values(await self._get_weekly_days(chat_id, end_date), 'mood_score')
+            return mood_levels if mood_levels else None
         except Exception as e:
             print(f"Error with user {chat_id} in get_mood_levels: {e}")
             return None
 
-    def generate_mood_report(self, chat_id, end_date=None):
+    async def generate_mood_report(self, chat_id, end_date=None):
         try:
-            mood_levels = self.get_mood_levels(chat_id, end_date)
+            mood_levels = await self.get_mood_levels(chat_id, end_date)
 
             if mood_levels:
-                total_days = len(mood_levels)
-                total_mood_score = sum(mood_levels.values())
-
-                if total_days > 0:
-                    average_mood_score = total_mood_score / total_days
-                    if average_mood_score > 0.1:
-                        feedback = self._get_mood_feedback(average_mood_score)
-
-                        report_string = f"Mood Report:\n__________________________\n{feedback}"
-                        return report_string
+                return self._build_mood_report(len(mood_levels), sum(mood_levels.values()))
         except Exception as e:
             print(f"Error with user {chat_id} in generate_mood_report: {e}")
             return None
 
+    def _build_mood_report(self, total_days, total_mood_score):
+        if total_days > 0:
+            average_mood_score = total_mood_score / total_days
+            if average_mood_score > 0.1:
+                feedback = self._get_mood_feedback(average_mood_score)
+
+                report_string = f"Mood Report:\n__________________________\n{feedback}"
+                return report_string
+
     def _get_mood_feedback(self, average_mood_score):
         try:
             if average_mood_score >= 7.5:
@@ -81,49 +132,25 @@ class ReportManager:
             print(f"Error in _get_mood_feedback: {e}")
             return None
 
-    def get_tasks_number(self, chat_id, end_date=None):
+    async def get_tasks_number(self, chat_id, end_date=None):
         try:
-            query = self._get_weekly_data_query(chat_id, end_date)
-            if query is None:
-                return None
-
-            data = list(self.db.counter_collection.find(query))
-
-            if data:
-                completed_tasks_number = {}
-                tasks_number = {}
-
-                for entry in data:
-                    date = entry['date']
-                    completed_tasks_number[date] = entry.get('completed_tasks', 0)
-                    tasks_number[date] = entry.get('task_counter', 0)
+            week_days = await self._get_weekly_days(chat_id, end_date)
 
+            if week_days:
+                completed_tasks_number = {day: figures.get('tasks_completed', 0) for day, figures in week_days.items()}
+                tasks_number = {day: figures.get('tasks_created', 0) for day, figures in week_days.items()}
                 return completed_tasks_number, tasks_number
         except Exception as e:
             print(f"Error with user {chat_id} in get_tasks_number: {e}")
             return None
 
-    def generate_tasks_report(self, chat_id, end_date=None):
+    async def generate_tasks_report(self, chat_id, end_date=None):
         try:
-            completed_tasks_number, tasks_number = self.get_tasks_number(chat_id, end_date)
+            completed_tasks_number, tasks_number = await self.get_tasks_number(chat_id, end_date)
 
             if completed_tasks_number is not None and tasks_number is not None:
-                total_completed_tasks = sum(completed_tasks_number.values())
-                total_tasks = sum(tasks_number.values())
-
-                if total_tasks:
-                    completion_rate = total_completed_tasks / total_tasks
-
-                    feedback = self._get_tasks_feedback(completion_rate)
-
-                    report_string = f"Tasks Report:\n__________________________\n" \
-                                    f"You completed {total_completed_tasks} tasks out of {total_tasks}" \
-                                    f" tasks this week.\n\n{feedback}"
-
-                    return report_string
-                else:
-                    print(f"No task data available for the {chat_id} user .")
-                    return None
+                return self._build_tasks_report(chat_id, sum(completed_tasks_number.values()),
+                                                sum(tasks_number.values()))
             else:
                 print("Error retrieving task data. Please try again later.")
                 return
@@ -132,6 +159,21 @@ class ReportManager:
             print(f"Error with user {chat_id} in generate_tasks_report: {e}")
             return None
 
+    def _build_tasks_report(self, chat_id, total_completed_tasks, total_tasks):
+        if total_tasks:
+            completion_rate = total_completed_tasks / total_tasks
+
+            feedback = self._get_tasks_feedback(completion_rate)
+
+            report_string = f"Tasks Report:\n__________________________\n" \
+                            f"You completed {total_completed_tasks} tasks out of {total_tasks}" \
+                            f" tasks this week.\n\n{feedback}"
+
+            return report_string
+        else:
+            print(f"No task data available for the {chat_id} user .")
+            return None
+
     def _get_tasks_feedback(self, completion_rate):
         try:
             if completion_rate == 1.0:
@@ -150,56 +192,29 @@ class ReportManager:
             print(f"Error in _get_tasks_feedback: {e}")
             return None
 
-    def get_habits_number(self, chat_id, end_date=None):
+    async def get_habits_number(self, chat_id, end_date=None):
         try:
-            query = self._get_weekly_data_query(chat_id, end_date)
-            if query is None:
-                return None
-
-            data = list(self.db.counter_collection.find(query))
-
-            if data:
-                completed_habits_number = {}
-
-                for entry in data:
-                    date = entry["date"]
-                    completed_habits_number[date] = entry.get("completed_habits", 0)
+            week_days = await self._get_weekly_days(chat_id, end_date)
 
-                total_days = len(completed_habits_number)
+            if week_days:
+                completed_habits_number = {day: figures.get('habits_completed', 0)
+                                           for day, figures in week_days.items()}
 
-                total_habits = self.db.habits_collection.count_documents({"chat_id": chat_id})
-
-                total_persistent_habits = total_habits * total_days
+                # Only the habits that existed on each day could have been committed to
+                total_persistent_habits = self._sum_days(week_days, 'habits_active')
 
                 return completed_habits_number, total_persistent_habits
         except Exception as e:
             print(f"Error with user {chat_id} in get_habits_number: {e}")
             return None
 
-    def generate_habits_report(self, chat_id, end_date=None):
+    async def generate_habits_report(self, chat_id, end_date=None):
         try:
-            completed_habits_number, total_possible_commits = self.get_habits_number(chat_id, end_date)
+            completed_habits_number, total_possible_commits = await self.get_habits_number(chat_id, end_date)
 
             if completed_habits_number is not None and total_possible_commits is not None:
-                total_completed_habits = sum(completed_habits_number.values())
-
-                if total_possible_commits:
-                    commitment_percentage = (total_completed_habits / total_possible_commits) * 100
-
-                    feedback = self._get_habits_feedback(commitment_percentage)
-
-                    report_string = (
-                        f"Habits Report:\n__________________________\n"
-                        f"Commitment: {commitment_percentage:.2f}%\n\n"
-                        f"You completed {total_completed_habits} commits out of {total_possible_commits} "
-                        f"possible commits toward your habits this week.\n"
-                        f"\n\n{feedback}"
-                    )
-
-                    return report_string
-                else:
-                    print(f"No habit data available for the {chat_id} user .")
-                    return None
+                return self._build_habits_report(chat_id, sum(completed_habits_number.values()),
+                                                 total_possible_commits)
             else:
                 print("Error retrieving habit data. Please try again later.")
                 return None
@@ -208,6 +223,25 @@ class ReportManager:
             print(f"Error with user {chat_id} in generate_habits_report: {e}")
             return None
 
+    def _build_habits_report(self, chat_id, total_completed_habits, total_possible_commits):
+        if total_possible_commits:
+            commitment_percentage = (total_completed_habits / total_possible_commits) * 100
+
+            feedback = self._get_habits_feedback(commitment_percentage)
+
+            report_string = (
+                f"Habits Report:\n__________________________\n"
+                f"Commitment: {commitment_percentage:.2f}%\n\n"
+                f"You completed {total_completed_habits} commits out of {total_possible_commits} "
+                f"possible commits toward your habits this week.\n"
+                f"\n\n{feedback}"
+            )
+
+            return report_string
+        else:
+            print(f"No habit data available for the {chat_id} user .")
+            return None
+
 
 
     def _get_habits_feedback(self, commitment_percentage):
@@ -232,50 +266,43 @@ class ReportManager:
             print(f"Error in _get_habits_feedback: {e}")
             return None
 
-    def get_satisfaction_ratings(self, chat_id, end_date=None):
+    async def get_satisfaction_ratings(self, chat_id, end_date=None):
         try:
-            query = self._get_weekly_data_query(chat_id, end_date)
-            if query is None:
-                return None
-
-            data = list(self.db.ratings_collection.find(query))
-            day_ratings = {}
-
-            if data:
-                for entry in data:
-                    date = entry['date']
-                    day_ratings[date] = entry.get('score', 0)
-
-                return day_ratings if day_ratings else None
+            day_ratings = self._get_day_values(await self._get_weekly_days(chat_id, end_date), 'rating')
+            return day_ratings if day_ratings else None
         except Exception as e:
             print(f"Error with user {chat_id} in get_satisfaction_ratings: {e}")
             return None
 
-    def generate_satisfaction_report(self, chat_id, end_date=None):
+    async def generate_satisfaction_report(self, chat_id, end_date=None):
         try:
-            data = self.get_satisfaction_ratings(chat_id, end_date)
+            data = await self.get_satisfaction_ratings(chat_id, end_date)
 
             if data:
-                total_days = len(data)
-                total_ratings = sum(data.values())
-                average_rating = total_ratings / total_days if total_days > 0 else 0
-
-                if average_rating > 0.1:
-                    most_satisfied_day = max(data, key=data.get)
-                    most_satisfied_rating = data[most_satisfied_day]
-
-                    feedback = self._get_satisfaction_feedback(average_rating)
-
-                    report_string = (
-                        f"Satisfaction Report of the Week:\n__________________________\n"
-                        f"Average satisfaction rating for the week: {average_rating:.2f}\n"
-                        f"Most satisfied day: {most_satisfied_day} with a rating of {most_satisfied_rating}\n\n{feedback}"
-                    )
-                    return report_string
+                return self._build_satisfaction_report(data)
         except Exception as e:
             print(f"Error with user {chat_id} in generate_satisfaction_report: {e}")
             return None
 
+    def _build_satisfaction_report(self, day_ratings):
+        total_days = len(day_ratings)
+        total_ratings = sum(day_ratings.values())
+        average_rating = total_ratings / total_days if total_days > 0 else 0
+
+        if average_rating > 0.1:
+            most_satisfied_day = max(day_ratings, key=day_ratings.get)
+            most_satisfied_rating = day_ratings[most_satisfied_day]
+            most_satisfied_day = datetime.strptime(most_satisfied_day, DAY_FORMAT).strftime(LEGACY_DATE_FORMAT)
+
+            feedback = self._get_satisfaction_feedback(average_rating)
+
+            report_string = (
+                f"Satisfaction Report of the Week:\n__________________________\n"
+                f"Average satisfaction rating for the week: {average_rating:.2f}\n"
+                f"Most satisfied day: {most_satisfied_day} with a rating of {most_satisfied_rating}\n\n{feedback}"
+            )
+            return report_string
+
     def _get_satisfaction_feedback(self, average_rating):
         try:
             if average_rating >= 6.5:
@@ -15,13 +15,13 @@ class TaskManager:
         chat_id = update.message.chat_id
         task_description = update.message.text.strip()
 
-        task_id = self.db.save_task(chat_id, task_description)
+        task_id = await self.db.save_task(chat_id, task_description)
         context.user_data[chat_id]['state'] = ''
         await update.message.reply_text(f"Task №:{task_id} was added!")
 
     async def show_tasks(self, update: Update, context: CallbackContext):
         chat_id = update.message.chat_id
-        tasks = self.db.get_tasks(chat_id)
+        tasks = await self.db.get_tasks(chat_id)
 
         if not tasks:
             await update.message.reply_text("You do not have any tasks yet!")
@@ -42,7 +42,7 @@ class TaskManager:
 
     async def complete_task(self, update: Update, context: CallbackContext):
         chat_id = update.message.chat_id
-        tasks = self.db.get_tasks(chat_id)
+        tasks = await self.db.get_tasks(chat_id)
 
         if not tasks:
             await update.message.reply_text("You do not have any tasks yet!")
@@ -65,12 +65,15 @@ class TaskManager:
         try:
             task_id = int(task_id)
 
-            if self.db.task_exists(chat_id, task_id):
+            result = await self.db.complete_task(chat_id, task_id)
 
-                self.db.complete_task(chat_id, task_id)
+            if result.modified:
                 context.user_data[chat_id]['state'] = ''
                 await update.message.reply_text(f"The task №:{task_id} "
                                                 f"has been marked as completed✅")
+            elif result.matched:
+                context.user_data[chat_id]['state'] = ''
+                await update.message.reply_text(f"The task №:{task_id} is already completed✅")
             else:
                 context.user_data[chat_id] = {'state': 'complete_task'}
                 await update.message.reply_text("Invalid task ID. Please choose a valid ID from the list👆🏿")
@@ -81,7 +84,7 @@ class TaskManager:
     async def delete_task(self, update: Update, context: CallbackContext):
         chat_id = update.message.chat_id
 
-        tasks = self.db.get_tasks(chat_id)
+        tasks = await self.db.get_tasks(chat_id)
         if tasks:
             tasks_text = "\n".join([f"{task['id']}. {task['description']}" for task in tasks])
             context.user_data[chat_id] = {'state': 'delete_task'}
@@ -96,8 +99,8 @@ class TaskManager:
 
         try:
             task_id = int(task_id)
-            if self.db.task_exists(chat_id, task_id):
-                self.db.delete_task(chat_id, task_id)
+            result = await self.db.delete_task(chat_id, task_id)
+            if result.matched:
                 context.user_data[chat_id]['state'] = ''
                 await update.message.reply_text(f"The task №:{task_id} has been removed.")
             else:
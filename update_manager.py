@@ -0,0 +1,52 @@
+import asyncio
+from telegram.ext import BaseUpdateProcessor
+
+
+class ChatUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates of different chats concurrently and the updates of one chat in arrival order.
+
+    The handlers keep a per-chat state machine in context.user_data, so two messages of the same
+    chat must never be handled at the same time or out of order.
+    """
+
+    # Handed to BaseUpdateProcessor, whose semaphore is entered before the chat lock; the real limit
+    # is self.slots, taken once the chat lock is held so that updates waiting for their chat hold no slot
+    UNBOUNDED = 2 ** 31 - 1
+
+    def __init__(self, max_concurrent_updates=256):
+        super().__init__(self.UNBOUNDED)
+        self.slots = asyncio.Semaphore(max_concurrent_updates)
+        # chat id -> [lock, number of updates holding or waiting for it]
+        self.chat_locks = {}
+
+    async def do_process_update(self, update, coroutine):
+        key = self._chat_key(update)
+        if key is None:
+            async with self.slots:
+                await coroutine
+            return
+
+        entry = self.chat_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            # asyncio.Lock wakes waiters first come, first served, which keeps the chat's order
+            async with entry[0], self.slots:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.chat_locks[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @staticmethod
+    def _chat_key(update):
+        chat = getattr(update, 'effective_chat', None)
+        if chat is not None:
+            return chat.id
+        user = getattr(update, 'effective_user', None)
+        return user.id if user is not None else None
@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import signal
+import asyncio
+from telegram import Update
+from tornado.httpserver import HTTPServer
+from tornado.web import Application as TornadoApplication, RequestHandler
+
+
+class TelegramUpdateHandler(RequestHandler):
+
+    def initialize(self, server):
+        self.server = server
+
+    async def post(self):
+        if not self.server.accepting:
+            # Telegram retries undelivered updates, so a draining process may refuse them
+            self.set_status(503)
+            return
+
+        if self.server.secret_token and \
+                self.request.headers.get('X-Telegram-Bot-Api-Secret-Token') != self.server.secret_token:
+            self.set_status(403)
+            return
+
+        try:
+            update = Update.de_json(json.loads(self.request.body), self.server.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            print(f"Rejected malformed update: {e}")
+            self.set_status(400)
+            return
+
+        await self.server.update_queue.put(update)
+        self.server.received += 1
+        self.set_status(200)
+
+
+class HealthHandler(RequestHandler):
+
+    def initialize(self, server):
+        self.server = server
+
+    def get(self):
+        self.set_status(200 if self.server.accepting else 503)
+        self.write(self.server.health())
+
+
+class WebhookServer:
+    """HTTP(S) endpoint that puts every update Telegram posts on an update queue.
+
+    POST /<path> takes updates, GET /health reports whether the process is taking them.
+    """
+
+    def __init__(self, update_queue, bot, listen='0.0.0.0', port=8443, path='telegram', secret_token=None,
+                 cert=None, key=None):
+        self.update_queue = update_queue
+        self.bot = bot
+        self.listen = listen
+        self.port = port
+        self.path = path.strip('/')
+        self.secret_token = secret_token
+        self.cert = cert
+        self.key = key
+        self.accepting = False
+        self.received = 0
+        self.started = None
+        self.http_server = None
+
+    def start(self):
+        web_app = TornadoApplication([
+            (rf"/{self.path}/?", TelegramUpdateHandler, {'server': self}),
+            (r"/health/?", HealthHandler, {'server': self}),
+        ])
+        ssl_options = {'certfile': self.cert, 'keyfile': self.key} if self.cert else None
+        self.http_server = HTTPServer(web_app, ssl_options=ssl_options, xheaders=True)
+        self.http_server.listen(self.port, address=self.listen)
+        self.started = time.monotonic()
+        self.accepting = True
+
+    async def stop(self):
+        # Telegram redelivers every update that did not get a 200, so closing connections loses none
+        self.accepting = False
+        if self.http_server:
+            self.http_server.stop()
+            await self.http_server.close_all_connections()
+
+    def health(self):
+        return {
+            'status': 'ok' if self.accepting else 'draining',
+            'received': self.received,
+            'queued': self.update_queue.qsize(),
+            'uptime': round(time.monotonic() - self.started, 1) if self.started else 0,
+        }
+
+
+class WebhookManager:
+    """Runs the bot Application on webhook updates instead of long polling, until SIGINT or SIGTERM."""
+
+    def __init__(self, app, url, drain_timeout=30, **server_options):
+        self.app = app
+        self.url = url.rstrip('/')
+        self.drain_timeout = drain_timeout
+        self.server = WebhookServer(app.update_queue, app.bot, **server_options)
+
+    @classmethod
+    def from_env(cls, app):
+        url = os.getenv("WEBHOOK_URL")
+        if not url:
+            raise ValueError("BOT_MODE=webhook needs WEBHOOK_URL, the public https URL Telegram posts updates to "
+                             "(without the WEBHOOK_PATH)")
+        return cls(
+            app,
+            url=url,
+            listen=os.getenv("WEBHOOK_LISTEN", '0.0.0.0'),
+            port=int(os.getenv("WEBHOOK_PORT", 8443)),
+            path=os.getenv("WEBHOOK_PATH", 'telegram'),
+            secret_token=os.getenv("WEBHOOK_SECRET"),
+            cert=os.getenv("WEBHOOK_CERT"),
+            key=os.getenv("WEBHOOK_KEY"),
+            drain_timeout=int(os.getenv("WEBHOOK_DRAIN_TIMEOUT", 30)),
+        )
+
+    def run(self):
+        asyncio.run(self._run())
+
+    async def _run(self):
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, stop.set)
+
+        # The same lifecycle run_polling goes through, with the webhook server as the update source
+        await self.app.initialize()
+        if self.app.post_init:
+            await self.app.post_init(self.app)
+        await self.app.start()
+
+        self.server.start()
+        certificate = None
+        if self.server.cert:
+            # Only needed for self-signed certificates, which Telegram has to be given
+            with open(self.server.cert, 'rb') as cert_file:
+                certificate = cert_file.read()
+        await self.app.bot.set_webhook(
+            url=f"{self.url}/{self.server.path}",
+            certificate=certificate,
+            secret_token=self.server.secret_token,
+            allowed_updates=Update.ALL_TYPES,
+        )
+        print(f"Webhook listening on {self.server.listen}:{self.server.port}/{self.server.path}")
+
+        try:
+            await stop.wait()
+        finally:
+            await self.drain()
+
+    async def drain(self):
+        """Stop taking updates, let the queued ones be handled, then shut the Application down.
+
+        Waiting for the queue and for Application.stop() (running handlers, jobs and tasks) together
+        takes at most drain_timeout seconds; whatever is still running then is cancelled. The webhook
+        stays registered, so Telegram keeps updates that arrive meanwhile for the next start.
+        """
+        print('Draining webhook updates...')
+        await self.server.stop()
+
+        deadline = time.monotonic() + self.drain_timeout
+        while self.app.update_queue.qsize() and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+        try:
+            await asyncio.wait_for(self.app.stop(), timeout=max(deadline - time.monotonic(), 0.1))
+        except asyncio.TimeoutError:
+            print(f"Gave up draining after {self.drain_timeout}s, "
+                  f"{self.app.update_queue.qsize()} updates left in the queue")
+        if self.app.post_stop:
+            await self.app.post_stop(self.app)
+        try:
+            await self.app.shutdown()
+        except RuntimeError as e:
+            # The cancelled stop() may leave the Application marked as running
+            print(f"Application shutdown skipped: {e}")
+        if self.app.post_shutdown:
+            await self.app.post_shutdown(self.app)